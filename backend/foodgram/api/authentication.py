@@ -0,0 +1,22 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который берёт пользователя из кэша токенов,
+    а не из базы на каждом запросе."""
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+        if not user.is_active:
+            token_cache.invalidate(key)
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return user, self.get_model()(key=key, user=user)
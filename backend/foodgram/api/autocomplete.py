@@ -0,0 +1,66 @@
+from bisect import bisect_left
+from threading import Lock
+
+from .cache import ingredients_cache
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Названия хранятся в отсортированном списке, поэтому совпадения по
+    началу строки находятся бинарным поиском. Индекс строится при первом
+    запросе и перестраивается, когда меняется версия справочника
+    ингредиентов (см. api.signals).
+    """
+
+    def __init__(self):
+        self._version = None
+        self._keys = []
+        self._items = []
+        self._lock = Lock()
+
+    def _get_data(self):
+        version = ingredients_cache.get_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+        return self._keys, self._items
+
+    def _build(self, version):
+        rows = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        self._keys = [row[0] for row in rows]
+        self._items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in rows
+        ]
+        self._version = version
+
+    def search(self, query, limit):
+        """Сначала ингредиенты, начинающиеся с query, затем содержащие его."""
+        keys, items = self._get_data()
+        query = query.casefold()
+        result = []
+        prefixed = set()
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(query)):
+            result.append(items[position])
+            prefixed.add(position)
+            position += 1
+        if len(result) < limit:
+            for position, key in enumerate(keys):
+                if query in key and position not in prefixed:
+                    result.append(items[position])
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,66 @@
+"""Сценарии нагрузочного теста API (команда benchmark_api).
+
+Каждый сценарий — запрос к горячему пути API и пороги, превышение
+которых считается регрессией: 95-й перцентиль времени ответа (мс)
+и максимальное число запросов к базе на один HTTP-запрос.
+"""
+from recipes.models import Recipe
+
+SCENARIOS = {
+    'recipes_list': {
+        'path': '/api/recipes/?limit=6',
+        'p95_ms': 150, 'max_queries': 10,
+    },
+    'recipes_list_limit_100': {
+        'path': '/api/recipes/?limit=100',
+        'p95_ms': 600, 'max_queries': 10,
+    },
+    'recipes_list_tags': {
+        'path': '/api/recipes/?tags=breakfast&tags=dinner',
+        'p95_ms': 150, 'max_queries': 10,
+    },
+    'recipes_list_author': {
+        'path': '/api/recipes/?author={author_id}',
+        'p95_ms': 150, 'max_queries': 10,
+    },
+    'recipes_favorited': {
+        'path': '/api/recipes/?is_favorited=1', 'auth': True,
+        'p95_ms': 150, 'max_queries': 10,
+    },
+    'recipes_in_shopping_cart': {
+        'path': '/api/recipes/?is_in_shopping_cart=1', 'auth': True,
+        'p95_ms': 150, 'max_queries': 10,
+    },
+    'recipe_detail': {
+        'path': '/api/recipes/{recipe_id}/', 'auth': True,
+        'p95_ms': 100, 'max_queries': 8,
+    },
+    'recipes_feed': {
+        'path': '/api/recipes/feed/', 'auth': True,
+        'p95_ms': 150, 'max_queries': 10,
+    },
+    'subscriptions': {
+        'path': '/api/users/subscriptions/?recipes_limit=3', 'auth': True,
+        'p95_ms': 150, 'max_queries': 8,
+    },
+    'ingredient_autocomplete': {
+        'path': '/api/ingredients/?name={ingredient_prefix}',
+        'p95_ms': 30, 'max_queries': 2,
+    },
+    'download_shopping_cart': {
+        'path': '/api/recipes/download_shopping_cart/', 'auth': True,
+        'setup': 'fill_shopping_cart',
+        'p95_ms': 200, 'max_queries': 8,
+    },
+}
+
+
+def fill_shopping_cart(user, rng):
+    """Корзина очищается при скачивании, поэтому заполняется заново."""
+    recipe_ids = list(Recipe.objects.values_list('pk', flat=True)[:500])
+    user.shopping_cart.add(*rng.sample(recipe_ids, min(10, len(recipe_ids))))
+
+
+SETUPS = {
+    'fill_shopping_cart': fill_shopping_cart,
+}
@@ -0,0 +1,265 @@
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+
+
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(alias=None):
+    """Общий ли кэш для всех процессов (memcached, база, файлы)."""
+    backend = caches[alias or settings.CATALOGUE_CACHE_ALIAS]
+    return not isinstance(backend, LOCAL_CACHE_BACKENDS)
+
+
+def get_version_timeout():
+    """Срок жизни ключей версий.
+
+    В общем кэше версия хранится бессрочно. LocMemCache у каждого
+    воркера свой, и изменение версии в одном процессе другие не увидят,
+    поэтому там версия живёт CACHE_VERSION_TIMEOUT секунд: после этого
+    процесс берёт новую версию и перечитывает данные.
+    """
+    if is_shared_cache():
+        return None
+    return settings.CACHE_VERSION_TIMEOUT
+
+
+class CatalogueCache:
+    """Двухуровневый кэш справочника (теги, ингредиенты).
+
+    Первый уровень — LRU-словарь в памяти процесса, второй — кэш Django.
+    Все ключи привязаны к версии справочника, которая меняется при любом
+    изменении данных. С общим кэшем (memcached, DatabaseCache) инвалидация
+    сразу видна всем процессам, с LocMemCache — не позже чем через
+    CACHE_VERSION_TIMEOUT секунд (см. get_version_timeout).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.maxsize = settings.CATALOGUE_CACHE_MAXSIZE
+        self._local = OrderedDict()
+        self._lock = Lock()
+        self._last_version = 0
+
+    @property
+    def backend(self):
+        return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+    @property
+    def version_key(self):
+        return f'catalogue:{self.name}:version'
+
+    def get_version(self):
+        """Версия справочника — время последнего изменения (timestamp)."""
+        version = self.backend.get(self.version_key)
+        if version is None:
+            # Истёкшая версия не должна совпасть с одной из прежних,
+            # данные которых ещё могут лежать в кэше процесса
+            version = max(int(time.time()), self._last_version + 1)
+            self.backend.add(self.version_key, version,
+                             timeout=get_version_timeout())
+            version = self.backend.get(self.version_key, version)
+        self._last_version = max(self._last_version, version)
+        return version
+
+    def get_etag(self, version):
+        return f'"{self.name}-{version}"'
+
+    def _shared_key(self, version, key):
+        return f'catalogue:{self.name}:{version}:{key}'
+
+    def get(self, version, key):
+        with self._lock:
+            local_key = (version, key)
+            if local_key in self._local:
+                self._local.move_to_end(local_key)
+                return self._local[local_key]
+        data = self.backend.get(self._shared_key(version, key))
+        if data is not None:
+            self._set_local(version, key, data)
+        return data
+
+    def set(self, version, key, data):
+        self.backend.set(self._shared_key(version, key), data,
+                         timeout=get_version_timeout())
+        self._set_local(version, key, data)
+
+    def _set_local(self, version, key, data):
+        with self._lock:
+            self._local[(version, key)] = data
+            self._local.move_to_end((version, key))
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def invalidate(self):
+        """Сбрасывает кэш справочника во всех процессах."""
+        version = max(int(time.time()), self.get_version() + 1)
+        self.backend.set(self.version_key, version,
+                         timeout=get_version_timeout())
+        self._last_version = version
+        with self._lock:
+            self._local.clear()
+
+
+tags_cache = CatalogueCache('tags')
+ingredients_cache = CatalogueCache('ingredients')
+# Только версия: меняется при изменении рецептов, их авторов и рейтингов
+# (api.signals) и входит в ETag списков рецептов
+recipes_cache = CatalogueCache('recipes')
+# Только версия: меняется при изменении счётчиков избранного и списков
+# покупок (api.signals) и входит в ETag списков рецептов
+counters_cache = CatalogueCache('counters')
+
+
+class RecipeFragmentCache:
+    """Кэш не зависящей от пользователя части представления рецепта.
+
+    Ключ содержит id рецепта, его time_modify, контрольную сумму полей
+    автора и версии справочников тегов и ингредиентов, поэтому изменённый
+    рецепт или автор просто получает новый ключ.
+    """
+    author_fields = ('username', 'email', 'first_name', 'last_name')
+
+    @property
+    def backend(self):
+        return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+    def get_author_version(self, author):
+        """Поля автора загружаются вместе с рецептом (select_related),
+        поэтому версия считается без запросов."""
+        values = '\0'.join(getattr(author, field)
+                           for field in self.author_fields)
+        return hashlib.md5(values.encode()).hexdigest()[:12]
+
+    def get_keys(self, recipes):
+        versions = (f'{tags_cache.get_version()}.'
+                    f'{ingredients_cache.get_version()}')
+        return {
+            recipe.pk: (f'recipe:{versions}:{recipe.pk}:'
+                        f'{recipe.time_modify.timestamp()}:'
+                        f'{self.get_author_version(recipe.author)}')
+            for recipe in recipes
+        }
+
+    def get_many(self, keys):
+        """Возвращает найденные фрагменты по id рецепта."""
+        cached = self.backend.get_many(keys.values())
+        return {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    def set_many(self, keys, fragments):
+        self.backend.set_many(
+            {keys[pk]: fragment for pk, fragment in fragments.items()},
+            timeout=settings.RECIPE_FRAGMENT_TIMEOUT,
+        )
+
+
+recipe_fragments = RecipeFragmentCache()
+
+
+def get_user_version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def get_user_version(user_id):
+    """Версия состояния пользователя: избранное, корзина и подписки."""
+    backend = caches[settings.CATALOGUE_CACHE_ALIAS]
+    version = backend.get(get_user_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        backend.add(get_user_version_key(user_id), version,
+                    timeout=get_version_timeout())
+        version = backend.get(get_user_version_key(user_id), version)
+    return version
+
+
+def bump_user_version(user_id):
+    backend = caches[settings.CATALOGUE_CACHE_ALIAS]
+    backend.set(get_user_version_key(user_id), time.time_ns(),
+                timeout=get_version_timeout())
+
+
+class TokenCache:
+    """Кэш соответствия токена пользователю для CachedTokenAuthentication.
+
+    Работает только с общим кэшем (см. is_shared_cache): удаление записи
+    при выходе, смене пароля или блокировке пользователя (см. api.signals)
+    сразу видно всем процессам. С LocMemCache запись в другом воркере
+    нельзя удалить, поэтому кэш отключается и токен проверяется по базе.
+    Запись живёт TOKEN_CACHE_TIMEOUT секунд. Если TOKEN_CACHE_LOCAL_TIMEOUT
+    больше нуля, записи дополнительно хранятся в памяти процесса, и
+    отозванный токен в других воркерах работает ещё до стольких секунд.
+
+    Хранятся только значения полей без хэша пароля, на каждый запрос
+    создаётся новый объект пользователя.
+    """
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def backend(self):
+        return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+    @property
+    def enabled(self):
+        return is_shared_cache()
+
+    def _key(self, token_key):
+        digest = hashlib.sha256(token_key.encode()).hexdigest()
+        return f'auth:token:{digest}'
+
+    def get(self, token_key):
+        if not self.enabled:
+            return None
+        key = self._key(token_key)
+        with self._lock:
+            expires, data = self._local.get(key, (0, None))
+            if expires < time.monotonic():
+                self._local.pop(key, None)
+                data = None
+        if data is None:
+            data = self.backend.get(key)
+            if data is None:
+                return None
+            self._set_local(key, data)
+        names, values = data
+        return get_user_model().from_db(DEFAULT_DB_ALIAS, names, values)
+
+    def set(self, token_key, user):
+        if not self.enabled:
+            return
+        names = [field.attname for field in user._meta.concrete_fields
+                 if field.attname != 'password']
+        data = (names, [getattr(user, name) for name in names])
+        key = self._key(token_key)
+        self.backend.set(key, data, timeout=settings.TOKEN_CACHE_TIMEOUT)
+        self._set_local(key, data)
+
+    def _set_local(self, key, data):
+        if settings.TOKEN_CACHE_LOCAL_TIMEOUT <= 0:
+            return
+        with self._lock:
+            expires = time.monotonic() + settings.TOKEN_CACHE_LOCAL_TIMEOUT
+            self._local[key] = (expires, data)
+            self._local.move_to_end(key)
+            while len(self._local) > settings.TOKEN_CACHE_MAXSIZE:
+                self._local.popitem(last=False)
+
+    def invalidate(self, token_key):
+        key = self._key(token_key)
+        self.backend.delete(key)
+        with self._lock:
+            self._local.pop(key, None)
+
+
+token_cache = TokenCache()
@@ -0,0 +1,17 @@
+from django.core.checks import Tags, Warning, register
+
+from .cache import is_shared_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared_cache():
+        return []
+    return [Warning(
+        'Кэш в памяти процесса: изменения справочников видны другим '
+        'воркерам с задержкой до CACHE_VERSION_TIMEOUT секунд, кэш '
+        'токенов авторизации отключён.',
+        hint='Укажите общий кэш, например CACHE_BACKEND=django.core.cache.'
+             'backends.memcached.PyMemcacheCache и CACHE_LOCATION.',
+        id='api.W001',
+    )]
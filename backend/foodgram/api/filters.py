@@ -1,23 +1,75 @@
-from django_filters.rest_framework import (CharFilter, FilterSet,
-                                           AllValuesMultipleFilter)
+from django.db.models import Exists, F, OuterRef
+from django_filters.rest_framework import (CharFilter, ChoiceFilter,
+                                           FilterSet, MultipleChoiceFilter)
 
-from recipes.models import Ingredient, Recipe
+from .cache import tags_cache
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
+
+
+def get_tag_ids():
+    """Соответствие slug -> id тегов из кэша справочника тегов."""
+    version = tags_cache.get_version()
+    tag_ids = tags_cache.get(version, 'slug_ids')
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        tags_cache.set(version, 'slug_ids', tag_ids)
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
 
 
 class IngredientNameFilter(FilterSet):
-    name = CharFilter(field_name='name', lookup_expr='istartswith')
+    name = CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
 
+    def filter_name(self, queryset, name, value):
+        """Ингредиенты, начинающиеся с value (индекс
+        ingredient_name_upper_prefix_idx, см. миграцию recipes 0004).
+        Совпадения в середине названия находит только индекс в памяти
+        (api.autocomplete)."""
+        return queryset.filter(name__istartswith=value)
+
 
 class RecipeFilter(FilterSet):
-    tags = AllValuesMultipleFilter(
-        field_name='tags__slug',
-        lookup_expr='exact',
+    tags = MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='filter_tags',
+    )
+    search = CharFilter(method='filter_search')
+    ordering = ChoiceFilter(
+        choices=(('popular', 'popular'), ('trending', 'trending')),
+        method='filter_ordering',
     )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags',)
+        fields = ('author', 'tags', 'search', 'ordering',)
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов. Подзапрос EXISTS вместо JOIN
+        не размножает рецепты с несколькими подходящими тегами."""
+        tag_ids = get_tag_ids()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=[tag_ids[slug] for slug in value
+                           if slug in tag_ids],
+            )
+        ))
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """Сортировка по рейтингу, пересчитываемому командой
+        update_rankings"""
+        field = 'popularity' if value == 'popular' else 'trending'
+        return queryset.order_by(
+            F(f'ranking__{field}').desc(nulls_last=True), '-time_create'
+        )
@@ -0,0 +1,232 @@
+import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import quote, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import (DEFAULT_DB_ALIAS, close_old_connections, connection,
+                       connections)
+from django.db.backends.signals import connection_created
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from .seed_benchmark_data import USERNAME_PREFIX
+from api.benchmark import SCENARIOS, SETUPS
+from recipes.models import Ingredient, Recipe
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    """Перцентиль отсортированного списка (метод ближайшего ранга)."""
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def summarize(results, elapsed):
+    """Сводка сценария по результатам клиентов (см. Command.run_client)."""
+    timings = sorted(t for result in results for t in result['timings'])
+    return {
+        'rps': len(timings) / elapsed,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'max': timings[-1],
+        'queries': max(result['queries'] for result in results),
+        'connections': sum(
+            result['connections'] for result in results) / len(timings),
+        'errors': sum(result['errors'] for result in results),
+    }
+
+
+class LocalClient:
+    """Запросы к приложению в том же процессе через тестовый клиент."""
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST='localhost')
+
+    def get(self, path, **headers):
+        response = self.client.get(path, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class LiveClient:
+    """Запросы к запущенному серверу (gunicorn, nginx) по одному
+    keep-alive соединению на клиента."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        connection_class = (HTTPSConnection if parts.scheme == 'https'
+                            else HTTPConnection)
+        self.connection = connection_class(parts.netloc, timeout=60)
+        self.prefix = parts.path.rstrip('/')
+
+    def get(self, path, **headers):
+        if 'HTTP_AUTHORIZATION' in headers:
+            headers = {'Authorization': headers['HTTP_AUTHORIZATION']}
+        try:
+            self.connection.request(
+                'GET', quote(self.prefix + path, safe='/?&=%'),
+                headers=headers,
+            )
+            response = self.connection.getresponse()
+            response.read()
+        except (HTTPException, OSError):
+            self.connection.close()
+            return 599
+        return response.status
+
+    def close(self):
+        self.connection.close()
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест горячих путей API через тестовый клиент '
+            'Django или запущенный сервер (--url). Данные создаются '
+            'командой seed_benchmark_data. Завершается ошибкой, если '
+            'превышены пороги сценариев')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на сценарий')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Количество параллельных клиентов')
+        parser.add_argument('--scenario', action='append',
+                            choices=sorted(SCENARIOS),
+                            help='Запустить только указанные сценарии')
+        parser.add_argument('--thresholds',
+                            help='JSON-файл с порогами p95_ms и max_queries '
+                                 'по сценариям')
+        parser.add_argument('--url',
+                            help='Адрес запущенного сервера, например '
+                                 'http://localhost:8000. Число запросов к БД '
+                                 'в этом режиме не измеряется')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__startswith=USERNAME_PREFIX)
+                     .order_by('pk')[:100])
+        if not users:
+            raise CommandError('Нет данных: выполните seed_benchmark_data')
+        self.tokens = dict(Token.objects.filter(user__in=users)
+                           .values_list('user_id', 'key'))
+        self.users = users
+        self.recipe_ids = list(Recipe.objects.filter(author__in=users)
+                               .values_list('pk', flat=True)[:1000])
+        self.prefixes = sorted({name[:2] for name in Ingredient.objects
+                                .values_list('name', flat=True)})
+        thresholds = {}
+        if options['thresholds']:
+            with open(options['thresholds']) as file:
+                thresholds = json.load(file)
+
+        self.url = options['url']
+        failures = []
+        self.stdout.write(f'{"сценарий":<26}{"rps":>8}{"p50":>9}{"p95":>9}'
+                          f'{"p99":>9}{"max":>9}{"sql":>6}{"conn":>6}'
+                          f'{"err":>5}')
+        for name in options['scenario'] or SCENARIOS:
+            scenario = {**SCENARIOS[name], **thresholds.get(name, {})}
+            result = self.run_scenario(scenario, options)
+            if self.url:
+                database = f'{"-":>6}{"-":>6}'
+            else:
+                database = (f'{result["queries"]:>6}'
+                            f'{result["connections"]:>6.2f}')
+            self.stdout.write(
+                f'{name:<26}{result["rps"]:>8.1f}{result["p50"]:>9.1f}'
+                f'{result["p95"]:>9.1f}{result["p99"]:>9.1f}'
+                f'{result["max"]:>9.1f}{database}{result["errors"]:>5}'
+            )
+            if result['errors']:
+                failures.append(f'{name}: {result["errors"]} ошибок')
+            if result['p95'] > scenario['p95_ms']:
+                failures.append(f'{name}: p95 {result["p95"]:.1f} мс > '
+                                f'{scenario["p95_ms"]} мс')
+            if not self.url and result['queries'] > scenario['max_queries']:
+                failures.append(f'{name}: {result["queries"]} запросов к БД '
+                                f'> {scenario["max_queries"]}')
+        if failures:
+            raise CommandError('Регрессия производительности:\n'
+                               + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Пороги не превышены'))
+
+    def run_scenario(self, scenario, options):
+        concurrency = options['concurrency']
+        per_client = max(1, options['requests'] // concurrency)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(
+                lambda number: self.run_client(
+                    scenario, per_client, options['seed'] + number
+                ),
+                range(concurrency),
+            ))
+        return summarize(results, time.perf_counter() - started)
+
+    def run_client(self, scenario, count, seed):
+        """Один клиент: последовательно выполняет count запросов.
+
+        Тестовый клиент не закрывает соединения с БД, поэтому это
+        делается вокруг каждого запроса, как в WSGI-сервере: с
+        CONN_MAX_AGE=0 каждый запрос открывает новое соединение.
+        """
+        rng = random.Random(seed)
+        client = LiveClient(self.url) if self.url else LocalClient()
+        timings, queries, errors = [], 0, 0
+        wrapper = connections[DEFAULT_DB_ALIAS]
+        opened = []
+
+        def count_connection(connection, **kwargs):
+            if connection is wrapper:
+                opened.append(connection)
+
+        connection_created.connect(count_connection, weak=False)
+        try:
+            for _ in range(count):
+                user = rng.choice(self.users)
+                headers = {}
+                if scenario.get('auth'):
+                    headers['HTTP_AUTHORIZATION'] = (
+                        f'Token {self.tokens[user.pk]}')
+                if scenario.get('setup'):
+                    SETUPS[scenario['setup']](user, rng)
+                path = scenario['path'].format(
+                    author_id=rng.choice(self.users).pk,
+                    recipe_id=rng.choice(self.recipe_ids),
+                    ingredient_prefix=rng.choice(self.prefixes),
+                )
+                counter = QueryCounter()
+                close_old_connections()
+                start = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    status_code = client.get(path, **headers)
+                timings.append((time.perf_counter() - start) * 1000)
+                close_old_connections()
+                queries = max(queries, counter.count)
+                errors += status_code >= 400
+        finally:
+            client.close()
+            connection_created.disconnect(count_connection)
+            connections.close_all()
+        return {'timings': timings, 'queries': queries, 'errors': errors,
+                'connections': len(opened)}
@@ -0,0 +1,70 @@
+import gzip
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+
+# Уровень сжатия gzip_comp_level в infra/nginx.conf
+GZIP_LEVEL = 5
+
+
+def measure(function, repeat):
+    """Медианное время вызова function в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендеринга и разбора JSON и размер ответа '
+            'до и после gzip для списка рецептов и списка ингредиентов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes-limit', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен: FastJSONRenderer использует '
+                'стандартный json'
+            ))
+        client = Client(HTTP_HOST='localhost')
+        payloads = {}
+        for name, path in (
+            ('recipes', f'/api/recipes/?limit={options["recipes_limit"]}'),
+            ('ingredients', '/api/ingredients/'),
+        ):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path}: {response.status_code}')
+            payloads[name] = json.loads(response.content)
+
+        self.stdout.write(f'{"данные":<13}{"рендерер":<18}{"render":>9}'
+                          f'{"parse":>9}{"байт":>10}{"gzip":>9}')
+        for name, data in payloads.items():
+            for renderer, parser in ((JSONRenderer(), JSONParser()),
+                                     (FastJSONRenderer(), FastJSONParser())):
+                content = renderer.render(data)
+                render_ms = measure(lambda: renderer.render(data),
+                                    options['repeat'])
+                parse_ms = measure(
+                    lambda: parser.parse(io.BytesIO(content)),
+                    options['repeat'],
+                )
+                compressed = gzip.compress(content, compresslevel=GZIP_LEVEL)
+                self.stdout.write(
+                    f'{name:<13}{type(renderer).__name__:<18}'
+                    f'{render_ms:>9.2f}{parse_ms:>9.2f}'
+                    f'{len(content):>10}{len(compressed):>9}'
+                )
@@ -0,0 +1,113 @@
+import os
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Amount, Ingredient, Recipe, Tag
+from recipes.search import fill_search_index
+from users.models import Follow
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'bench_user_'
+BENCHMARK_PASSWORD = 'bench-password'
+WORDS = ('блины', 'суп', 'салат', 'пирог', 'каша', 'омлет', 'рагу', 'плов',
+         'запеканка', 'котлеты', 'домашний', 'быстрый', 'летний', 'острый')
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу данными для нагрузочного тестирования: '
+            'пользователи, рецепты, избранное, корзины и подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Рецептов в избранном у пользователя')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Рецептов в корзине у пользователя')
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок у пользователя')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--data-dir', default=settings.DATA_DIR)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        for name in ('tags', 'ingredients'):
+            call_command(
+                'load_catalogue', name, stdout=self.stdout,
+                path=os.path.join(options['data_dir'], f'{name}.json'),
+            )
+        tags = list(Tag.objects.all())
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+
+        start = User.objects.filter(
+            username__startswith=USERNAME_PREFIX).count()
+        password = make_password(BENCHMARK_PASSWORD)
+        users = User.objects.bulk_create(
+            User(username=f'{USERNAME_PREFIX}{number}',
+                 email=f'{USERNAME_PREFIX}{number}@example.com',
+                 first_name='Бенчмарк', last_name=str(number),
+                 password=password)
+            for number in range(start, start + options['users'])
+        )
+        users = list(User.objects.filter(
+            username__in=[user.username for user in users]))
+        Token.objects.bulk_create(Token(user=user, key=Token.generate_key())
+                                  for user in users)
+
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=rng.choice(users),
+                   name=' '.join(rng.sample(WORDS, 2)).capitalize(),
+                   text=' '.join(rng.choices(WORDS, k=30)),
+                   cooking_time=rng.randint(5, 180))
+            for _ in range(options['recipes'])
+        )
+        recipe_ids = list(Recipe.objects.filter(
+            author__in=users).values_list('pk', flat=True))
+
+        Amount.objects.bulk_create(
+            Amount(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                   amount=rng.randint(1, 500))
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(ingredient_ids,
+                                            rng.randint(3, 15))
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.pk)
+            for recipe_id in recipe_ids
+            for tag in rng.sample(tags, rng.randint(1, len(tags)))
+        )
+        for through, per_user in (
+                (Recipe.subscribers.through, options['favorites']),
+                (Recipe.buyers.through, options['cart'])):
+            through.objects.bulk_create(
+                (through(user_id=user.pk, recipe_id=recipe_id)
+                 for user in users
+                 for recipe_id in rng.sample(
+                     recipe_ids, min(per_user, len(recipe_ids)))),
+                ignore_conflicts=True,
+            )
+        Follow.objects.bulk_create(
+            (Follow(user=user, author=author)
+             for user in users
+             for author in rng.sample(users, min(options['follows'],
+                                                 len(users)))
+             if author != user),
+            ignore_conflicts=True,
+        )
+
+        fill_search_index()
+        call_command('recount_counters', stdout=self.stdout)
+        call_command('update_rankings', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)}'
+        ))
@@ -0,0 +1,62 @@
+"""Метрики запросов в формате Prometheus.
+
+У каждого воркера gunicorn свои значения, а запрос /metrics/ попадает
+в один случайный воркер. Поэтому при нескольких воркерах
+prometheus_client работает в многопроцессном режиме: если задана
+переменная окружения PROMETHEUS_MULTIPROC_DIR, воркеры пишут значения
+в файлы в этом каталоге, а /metrics/ суммирует файлы всех воркеров,
+включая перезапущенные (см. gunicorn.conf.py). Без неё метрики берутся
+из памяти процесса, что подходит только для одного процесса
+(runserver, тесты).
+"""
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Histogram,
+                               generate_latest)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+LABELS = ('view', 'method', 'status')
+
+request_duration = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса', LABELS, buckets=DURATION_BUCKETS,
+)
+request_db_duration = Histogram(
+    'foodgram_request_db_duration_seconds',
+    'Время запросов к базе данных за запрос', LABELS,
+    buckets=DURATION_BUCKETS,
+)
+request_db_queries = Histogram(
+    'foodgram_request_db_queries',
+    'Количество запросов к базе данных за запрос', LABELS,
+    buckets=QUERY_BUCKETS,
+)
+request_serializer_duration = Histogram(
+    'foodgram_request_serializer_duration_seconds',
+    'Время сериализации данных ответа', LABELS, buckets=DURATION_BUCKETS,
+)
+request_render_duration = Histogram(
+    'foodgram_request_render_duration_seconds',
+    'Время отрисовки ответа', LABELS, buckets=DURATION_BUCKETS,
+)
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Метрики для Prometheus, доступны только с разрешённых адресов."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(generate_latest(get_registry()),
+                        content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,135 @@
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from threading import local
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger('foodgram.performance')
+
+timings = local()
+
+
+@contextmanager
+def measure(phase):
+    """Добавляет время блока к фазе текущего запроса.
+
+    Вне PerformanceMiddleware ничего не замеряет; вложенные замеры одной
+    фазы (сериализатор внутри сериализатора) не суммируются повторно.
+    """
+    phases = getattr(timings, 'phases', None)
+    if phases is None or phase in timings.active:
+        yield
+        return
+    timings.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[phase] += time.perf_counter() - start
+        timings.active.discard(phase)
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper: считает запросы и время в базе."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+
+class PerformanceMiddleware:
+    """Замеряет время запроса, обращения к базе, сериализацию
+    и отрисовку ответа.
+
+    Добавляет заголовок Server-Timing, пишет в лог медленные запросы
+    с повторяющимися SQL-запросами и собирает гистограммы для
+    api.metrics по представлению и методу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        recorder = QueryRecorder()
+        request._render_duration = 0
+        timings.phases = Counter()
+        timings.active = set()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            serializer_duration = timings.phases['serializer']
+            timings.phases = None
+        duration = time.perf_counter() - start
+
+        render_duration = request._render_duration
+        response['Server-Timing'] = ', '.join((
+            f'db;desc="{recorder.count} queries";'
+            f'dur={recorder.duration * 1000:.1f}',
+            f'serializer;dur={serializer_duration * 1000:.1f}',
+            f'render;dur={render_duration * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        self.observe(request, response, duration, serializer_duration,
+                     render_duration, recorder)
+        if duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            self.log_slow_request(request, response, duration, recorder)
+        return response
+
+    def process_template_response(self, request, response):
+        render_start = time.perf_counter()
+
+        def finish_render(rendered):
+            request._render_duration = time.perf_counter() - render_start
+
+        response.add_post_render_callback(finish_render)
+        return response
+
+    def observe(self, request, response, duration, serializer_duration,
+                render_duration, recorder):
+        match = request.resolver_match
+        labels = (
+            match.view_name if match else 'unresolved',
+            request.method,
+            str(response.status_code)[0] + 'xx',
+        )
+        metrics.request_duration.labels(*labels).observe(duration)
+        metrics.request_db_duration.labels(*labels).observe(
+            recorder.duration)
+        metrics.request_db_queries.labels(*labels).observe(recorder.count)
+        metrics.request_serializer_duration.labels(*labels).observe(
+            serializer_duration)
+        metrics.request_render_duration.labels(*labels).observe(
+            render_duration)
+
+    def log_slow_request(self, request, response, duration, recorder):
+        duplicates = [
+            f'{count}x {sql}'
+            for sql, count in recorder.statements.most_common(5)
+            if count > 1
+        ]
+        logger.warning(
+            'Медленный запрос %s %s: %d мс, статус %s, '
+            'запросов к БД %d (%.1f мс)%s',
+            request.method, request.get_full_path(), duration * 1000,
+            response.status_code, recorder.count, recorder.duration * 1000,
+            ''.join(f'\n  {line}' for line in duplicates),
+        )
@@ -1,4 +1,14 @@
-from rest_framework import mixins, viewsets
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, urlencode
+from rest_framework import mixins, response, status, viewsets
+
+from .cache import (counters_cache, get_user_version, ingredients_cache,
+                    is_shared_cache, recipes_cache, tags_cache)
+from .paginators import KeysetPagination
 
 
 class ListRetrieveModelViewSet(
@@ -7,3 +17,159 @@ class ListRetrieveModelViewSet(
     viewsets.GenericViewSet
 ):
     pass
+
+
+class CachedCatalogueMixin:
+    """Отдаёт справочник из кэша и поддерживает условные GET-запросы.
+
+    Ответ не зависит от пользователя, поэтому аутентификация отключена:
+    попадание в кэш и ответ 304 обходятся без обращения к базе.
+    """
+    catalogue_cache = None
+    authentication_classes = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = self.catalogue_cache
+        version = cache.get_version()
+        etag = cache.get_etag(version)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=version
+        )
+        if not_modified is not None:
+            return not_modified
+
+        key = self.get_cache_key(handler, request, **kwargs)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        data = cache.get(version, key)
+        if data is None:
+            result = handler(request, *args, **kwargs)
+            if result.status_code != status.HTTP_200_OK:
+                return result
+            data = result.data
+            cache.set(version, key, data)
+        result = response.Response(data)
+        result['ETag'] = etag
+        result['Last-Modified'] = http_date(version)
+        return result
+
+    def get_cache_key(self, handler, request, **kwargs):
+        """Ключ из обработчика и проверенных параметров фильтра: другие
+        параметры запроса и их порядок не создают новых записей в кэше.
+        Для некорректных параметров None — ответ не кэшируется."""
+        params = {}
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            filterset = filterset_class(request.query_params)
+            if not filterset.is_valid():
+                return None
+            params = {name: value
+                      for name, value in filterset.form.cleaned_data.items()
+                      if value not in (None, '')}
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        return (f'{handler.__name__}:{lookup}?'
+                f'{urlencode(sorted(params.items()))}')
+
+
+class KeysetPaginationMixin:
+    """Включает пагинацию по курсору параметром ?pagination=cursor."""
+    keyset_ordering = ('-id',)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = KeysetPagination(self.keyset_ordering)
+            else:
+                return super().paginator
+        return self._paginator
+
+
+class ConditionalRecipeMixin:
+    """ETag, Last-Modified и Cache-Control для списка и отдельного рецепта.
+
+    Версия списка — версии recipes_cache, которая меняется при изменении
+    рецептов, их авторов и рейтингов, и counters_cache, которая меняется
+    вместе со счётчиками избранного и списков покупок, поэтому проверка
+    не требует запросов к базе. Версия отдельного рецепта берётся из его
+    строки: time_modify, счётчики и поля автора. К ним добавляются версии
+    справочников тегов и ингредиентов и, для авторизованного пользователя,
+    версия его избранного, корзины и подписок. Анонимные ответы можно
+    кэшировать на прокси, авторизованные — только перепроверять.
+
+    Версия пользователя надёжна только в общем кэше: в LocMemCache другой
+    воркер не видит её изменения и ответил бы 304 с устаревшими
+    is_favorited и is_in_shopping_cart. Поэтому без общего кэша
+    авторизованным пользователям условные ответы не отдаются.
+    """
+
+    def list(self, request, *args, **kwargs):
+        version = recipes_cache.get_version()
+        counters_version = counters_cache.get_version()
+        return self.conditional_response(
+            super().list, max(version, counters_version),
+            (version, counters_version), request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg
+                                            or self.lookup_field]}
+        state = self.get_queryset().model.objects.filter(
+            **lookup
+        ).values_list(
+            'time_modify', 'favorites_count', 'shopping_cart_count',
+            'author__username', 'author__email', 'author__first_name',
+            'author__last_name',
+        ).first()
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(
+            super().retrieve, int(state[0].timestamp()),
+            (*lookup.values(), *state), request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, last_modified, parts,
+                             request, *args, **kwargs):
+        user = request.user
+        if user.is_authenticated and not is_shared_cache():
+            result = handler(request, *args, **kwargs)
+            if result.status_code == status.HTTP_200_OK:
+                patch_cache_control(result, private=True, no_cache=True)
+            patch_vary_headers(result, ('Authorization',))
+            return result
+
+        parts = [
+            *parts,
+            tags_cache.get_version(),
+            ingredients_cache.get_version(),
+        ]
+        if user.is_authenticated:
+            parts += [user.pk, get_user_version(user.pk)]
+        etag = '"{}"'.format(hashlib.md5(
+            ':'.join(map(str, parts)).encode()
+        ).hexdigest())
+        timestamp = None if user.is_authenticated else last_modified
+
+        result = get_conditional_response(request, etag=etag,
+                                          last_modified=timestamp)
+        if result is None:
+            result = handler(request, *args, **kwargs)
+        if result.status_code in (status.HTTP_200_OK,
+                                  status.HTTP_304_NOT_MODIFIED):
+            result['ETag'] = etag
+            if timestamp is not None:
+                result['Last-Modified'] = http_date(timestamp)
+            if user.is_authenticated:
+                patch_cache_control(result, private=True, no_cache=True)
+            else:
+                patch_cache_control(result, public=True,
+                                    max_age=settings.RECIPE_CACHE_MAX_AGE)
+        patch_vary_headers(result, ('Authorization',))
+        return result
@@ -1,6 +1,138 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class NumPageLimitPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+def estimate_count(queryset):
+    """Оценка количества строк по плану запроса PostgreSQL (без COUNT)."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по курсору (keyset) для бесконечной ленты.
+
+    Страница выбирается условием по ключу сортировки последнего
+    показанного объекта, а не OFFSET, поэтому стоимость не растёт с
+    глубиной прокрутки. Общее количество не считается, если не передан
+    параметр count=exact или count=estimate. Запрос с собственной
+    сортировкой (поиск, ?ordering=) отклоняется с ошибкой 400.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Неверный курсор'
+    unsupported_ordering_message = (
+        'Пагинация по курсору не поддерживает эту сортировку, '
+        'используйте постраничную пагинацию'
+    )
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = queryset.query.order_by
+        if ordering and tuple(ordering) != tuple(self.ordering):
+            # Курсор строится только по self.ordering: другая сортировка
+            # (релевантность поиска, рейтинг) была бы молча потеряна
+            raise ValidationError(
+                {'pagination': [self.unsupported_ordering_message]}
+            )
+        queryset = queryset.order_by(*self.ordering)
+        self.count = self.get_count(queryset, request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            position = self.decode_cursor(cursor, queryset.model)
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = self.get_position(page[-1])
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    def get_position(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def get_position_filter(self, position):
+        """(a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, position):
+        data = json.dumps([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in position
+        ])
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        content = OrderedDict()
+        if self.count is not None:
+            content['count'] = self.count
+        content['next'] = self.get_next_link()
+        content['results'] = data
+        return Response(content)
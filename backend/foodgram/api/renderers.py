@@ -0,0 +1,39 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен.
+
+    Вывод совпадает с JSONRenderer: даты форматируются его кодировщиком,
+    U+2028 и U+2029 экранируются. Запросы с отступами (indent, Browsable
+    API) и окружения без orjson обслуживает стандартный рендерер.
+    """
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type,
+                                             renderer_context or {}):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        if data is None:
+            return b''
+        content = orjson.dumps(
+            data,
+            default=self.encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
@@ -1,7 +1,22 @@
+import base64
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.files import File
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from PIL import Image
 from rest_framework import serializers, validators
 
-from recipes.models import Amount, Ingredient, Recipe, Tag
+from .cache import recipe_fragments
+from .middleware import measure
+from .viewer import get_viewer_state
+from recipes.images import update_thumbnail
+from recipes.models import (Amount, Ingredient, Recipe, Tag,
+                            get_recipe_prefetch)
 from users.models import Follow
 
 
@@ -10,38 +25,89 @@ User = get_user_model()
 
 class Base64Field(serializers.ImageField):
     """Класс для преобразования строки base64 в изображение."""
+    default_error_messages = {
+        'max_size': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+    extensions = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+    # Кратно 4, чтобы части не разрывали группы символов base64
+    chunk_size = 64 * 1024
 
     def to_internal_value(self, data):
-        from django.core.files.base import ContentFile
-        import base64
-        import six
-        import uuid
-
-        if isinstance(data, six.string_types):
+        if isinstance(data, str):
             if 'data:' in data and ';base64,' in data:
                 header, data = data.split(';base64,')
+            data = self.decode(data)
+        return super().to_internal_value(data)
+
+    def decode(self, data):
+        """Декодирует base64 по частям во временный файл и проверяет,
+        что это изображение допустимого формата и размера."""
+        # Переносы строк и пробелы допустимы в base64 (MIME), но
+        # b64decode(validate=True) их не пропускает
+        data = ''.join(data.split())
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if len(data) // 4 * 3 > max_size:
+            self.fail('max_size', max_size=max_size)
+
+        decoded_file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        try:
+            for start in range(0, len(data), self.chunk_size):
+                decoded_file.write(base64.b64decode(
+                    data[start:start + self.chunk_size], validate=True
+                ))
+            decoded_file.seek(0)
+            image = Image.open(decoded_file)
+            image.verify()
+        except Exception:
+            self.fail('invalid_image')
+
+        extension = self.extensions.get(image.format)
+        if extension is None:
+            self.fail('invalid_image')
+        decoded_file.seek(0)
+        return File(decoded_file, name=f'{uuid.uuid4().hex[:12]}.{extension}')
+
+
+class TimedSerializerMixin:
+    """Учитывает сериализацию в фазе serializer заголовка Server-Timing
+    и метрик (api.middleware).
 
-            try:
-                decoded_file = base64.b64decode(data)
-            except TypeError:
-                self.fail('invalid_image')
+    Вложенные поля вызывают to_representation, а не data, поэтому
+    замеряется только сериализатор верхнего уровня. Для many=True по
+    умолчанию используется TimedListSerializer.
+    """
 
-            file_name = str(uuid.uuid4())[:12]
-            file_extension = self.get_file_extension(file_name, decoded_file)
-            complited_file_name = '%s.%s' % (file_name, file_extension,)
-            data = ContentFile(decoded_file, name=complited_file_name)
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = TimedListSerializer
 
-        return super(Base64Field, self).to_internal_value(data)
+    @property
+    def data(self):
+        with measure('serializer'):
+            return super().data
 
-    def get_file_extension(self, file_name, decoded_file):
-        import imghdr
 
-        extension = imghdr.what(file_name, decoded_file)
-        extension = 'jpg' if extension == 'jpeg' else extension
-        return extension
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TimedModelSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
+    pass
+
+
+def get_thumbnail_url(recipe):
+    """Миниатюра рецепта, пока она не готова — исходное изображение."""
+    if recipe.thumbnail:
+        return recipe.thumbnail.url
+    return recipe.image.url if recipe.image else ''
+
+
+class TagSerializer(TimedModelSerializer):
     """Сериализатор модели Tag"""
 
     class Meta:
@@ -49,7 +115,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedModelSerializer):
     """Сериализатор модели Ingredient"""
 
     class Meta:
@@ -76,7 +142,7 @@ class AmountWriteSerializer(serializers.Serializer):
     amount = serializers.IntegerField(min_value=1)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedModelSerializer):
     """Класс для сериализации модели пользователя"""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -116,39 +182,108 @@ class UserSerializer(serializers.ModelSerializer):
         return email
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return (user.is_authenticated and
-                Follow.objects.filter(user=user, author=obj).exists())
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        state = get_viewer_state(self.context['request'])
+        return obj.pk in state.following
+
 
+class RecipeListSerializer(TimedListSerializer):
+    """Собирает список рецептов из кэшированных фрагментов.
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+    Из базы подгружаются связанные объекты только для рецептов, которых
+    нет в кэше; флаги пользователя берутся из аннотаций запроса.
+    """
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        if not settings.RECIPE_FRAGMENT_CACHE:
+            return super().to_representation(recipes)
+        return self.child.to_representation_many(recipes)
+
+
+class RecipeReadSerializer(TimedModelSerializer):
     """Сериализатор для чтения рецептов"""
     ingredients = AmountReadSerializer(many=True, source='amount')
     author = UserSerializer(read_only=True)
     tags = TagSerializer(read_only=True, many=True)
     image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    dynamic_fields = ('is_favorited', 'is_in_shopping_cart',
+                      'favorites_count', 'shopping_cart_count')
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
                   'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'cooking_time', 'favorites_count', 'shopping_cart_count',
+                  'thumbnail')
         read_only_fields = ('author',)
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        if settings.RECIPE_FRAGMENT_CACHE:
+            return self.to_representation_many([instance])[0]
+        if hasattr(instance, 'is_subscribed'):
+            instance.author.is_subscribed = instance.is_subscribed
+        return super().to_representation(instance)
+
+    def to_representation_many(self, recipes):
+        keys = recipe_fragments.get_keys(recipes)
+        fragments = recipe_fragments.get_many(keys)
+        missing = [recipe for recipe in recipes if recipe.pk not in fragments]
+        if missing:
+            prefetch_related_objects(missing, *get_recipe_prefetch())
+            new_fragments = {recipe.pk: self.to_fragment(recipe)
+                             for recipe in missing}
+            recipe_fragments.set_many(keys, new_fragments)
+            fragments.update(new_fragments)
+        return [self.add_dynamic_fields(fragments[recipe.pk], recipe)
+                for recipe in recipes]
+
+    def to_fragment(self, instance):
+        """Представление рецепта без полей, зависящих от пользователя,
+        и без счётчиков: они меняются при каждом добавлении в избранное
+        или корзину и берутся из строки рецепта (add_dynamic_fields)."""
+        instance.author.is_subscribed = None
+        fragment = super().to_representation(instance)
+        del instance.author.is_subscribed
+        for field in self.dynamic_fields:
+            fragment[field] = None
+        return fragment
+
+    def add_dynamic_fields(self, fragment, instance):
+        data = fragment.copy()
+        data['favorites_count'] = instance.favorites_count
+        data['shopping_cart_count'] = instance.shopping_cart_count
+        data['author'] = fragment['author'].copy()
+        data['author']['is_subscribed'] = (
+            instance.is_subscribed if hasattr(instance, 'is_subscribed')
+            else self.fields['author'].get_is_subscribed(instance.author)
+        )
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        return data
 
     def get_image(self, instance):
         return instance.image.url if instance.image else ''
 
+    def get_thumbnail(self, instance):
+        return get_thumbnail_url(instance)
+
     def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        return (user.is_authenticated and
-                obj in user.favorites.all())
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        state = get_viewer_state(self.context['request'])
+        return obj.pk in state.favorites
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return (user.is_authenticated and
-                obj in user.shopping_cart.all())
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        state = get_viewer_state(self.context['request'])
+        return obj.pk in state.shopping_cart
 
 
 class RecipeWriteSerializer(serializers.Serializer):
@@ -161,94 +296,106 @@ class RecipeWriteSerializer(serializers.Serializer):
     text = serializers.CharField()
     cooking_time = serializers.IntegerField(min_value=1)
 
+    def validate_ingredients(self, ingredients):
+        ingredient_ids = [obj['id'].pk for obj in ingredients]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                'Ингредиент уже добавлен в рецепт'
+            )
+        return ingredients
+
+    @transaction.atomic
     def create(self, validated_data):
         user = self.context['request'].user
-
         tags = validated_data.pop('tags')
-        ingredients_field = validated_data.pop('ingredients')
-
-        ingredients_list = []
-        amounts = []
-
-        recipe = Recipe(author=user, **validated_data)
-        recipe.save()
-        for obj in ingredients_field:
-            ingredient = obj.get('id')
-            if obj in ingredients_list:
-                raise serializers.ValidationError(
-                    {'error': 'Ингредиент уже добавлен в рецепт'}
-                )
-            amounts.append(
-                Amount(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    amount=obj.get('amount')
-                )
-            )
-            ingredients_list.append(ingredient)
+        ingredients = validated_data.pop('ingredients')
 
-        Amount.objects.bulk_create(amounts)
+        recipe = Recipe.objects.create(author=user, **validated_data)
+        update_thumbnail(recipe)
+        Amount.objects.bulk_create(
+            Amount(recipe=recipe, ingredient=obj['id'], amount=obj['amount'])
+            for obj in ingredients
+        )
         recipe.tags.set(tags)
-        recipe.ingredients.set(ingredients_list)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        recipe.tags.clear()
-        recipe.ingredients.clear()
-        amount = Amount.objects.filter(recipe=recipe)
-        amount.delete()
-
-        tags = validated_data.pop('tags')
-        ingredients_field = validated_data.pop('ingredients')
-        ingredients_list = []
-        amounts = []
-        for obj in ingredients_field:
-            ingredient = obj.get('id')
-            if ingredient in ingredients_list:
-                raise serializers.ValidationError(
-                    {'error': 'Ингредиент уже добавлен в рецепт'}
-                )
-            amounts.append(
-                Amount(
-                    recipe=recipe,
-                    ingredient=ingredient,
-                    amount=obj.get('amount')
-                )
-            )
-            ingredients_list.append(ingredient)
-
-        Amount.objects.bulk_create(amounts)
-
-        recipe.name = validated_data.get('name', recipe.name)
-        recipe.image = validated_data.get('image', recipe.image)
-        recipe.text = validated_data.get('text', recipe.text)
-        recipe.cooking_time = validated_data.get('cooking_time',
-                                                 recipe.cooking_time)
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
 
+        for field, value in validated_data.items():
+            setattr(recipe, field, value)
         recipe.save()
-        recipe.tags.add(*tags)
-        recipe.ingredients.add(*ingredients_list)
-
+        if 'image' in validated_data:
+            update_thumbnail(recipe)
+        if tags is not None:
+            recipe.tags.set(tags)
+        if ingredients is not None:
+            self.update_amounts(recipe, ingredients)
         return recipe
 
+    def update_amounts(self, recipe, ingredients):
+        """Меняет только те строки Amount, которые отличаются от текущих."""
+        new_amounts = {obj['id'].pk: obj['amount'] for obj in ingredients}
+        current = {amount.ingredient_id: amount
+                   for amount in recipe.amount.all()}
+
+        removed = current.keys() - new_amounts.keys()
+        if removed:
+            recipe.amount.filter(ingredient_id__in=removed).delete()
+
+        changed = []
+        for ingredient_id, amount in current.items():
+            if (ingredient_id in new_amounts
+                    and amount.amount != new_amounts[ingredient_id]):
+                amount.amount = new_amounts[ingredient_id]
+                changed.append(amount)
+        if changed:
+            Amount.objects.bulk_update(changed, ('amount',))
+
+        added = new_amounts.keys() - current.keys()
+        if added:
+            Amount.objects.bulk_create(
+                Amount(recipe=recipe, ingredient_id=ingredient_id,
+                       amount=new_amounts[ingredient_id])
+                for ingredient_id in added
+            )
+
     def to_representation(self, instance):
         return RecipeReadSerializer(instance, context=self.context).data
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class FavoriteSerializer(TimedModelSerializer):
     """Класс для сериализации рецепта в избранном"""
     image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
-        read_only_fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'thumbnail', 'cooking_time')
+        read_only_fields = ('id', 'name', 'image', 'thumbnail',
+                            'cooking_time')
 
     def get_image(self, instance):
         return instance.image.url if instance.image else ''
 
+    def get_thumbnail(self, instance):
+        return get_thumbnail_url(instance)
+
+
+def get_recipes_limit(request):
+    """Проверяет параметр recipes_limit: целое число не меньше нуля."""
+    limit = request.query_params.get('recipes_limit')
+    if limit is None:
+        return None
+    try:
+        return serializers.IntegerField(min_value=0).run_validation(limit)
+    except serializers.ValidationError as error:
+        raise serializers.ValidationError({'recipes_limit': error.detail})
+
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(TimedModelSerializer):
     """Сериализатор для подписки на пользователя."""
     id = serializers.ReadOnlyField(source='author.id')
     email = serializers.ReadOnlyField(source='author.email')
@@ -257,7 +404,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     last_name = serializers.ReadOnlyField(source='author.last_name')
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source='author.recipes.count')
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -266,26 +413,40 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
-        return (
-            user.is_authenticated and
-            Follow.objects.filter(
-                user=obj.user,
-                author=obj.author
-            ).exists()
-        )
+        return user.is_authenticated and obj.user_id == user.id
 
     def get_recipes(self, obj):
-        params = self.context.get('request').query_params
-        limit = params.get('recipes_limit')
-        recipes = obj.author.recipes
-        if limit:
-            recipes = recipes.all()[:int(limit)]
+        if hasattr(obj.author, 'latest_recipes'):
+            recipes = obj.author.latest_recipes
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = obj.author.recipes.all()
+            if limit is not None:
+                recipes = recipes[:limit]
         context = {'request': self.context.get('request')}
         return FavoriteSerializer(
             recipes, context=context, many=True).data
 
+    def get_recipes_count(self, obj):
+        try:
+            return obj.author.statistics.recipes_count
+        except ObjectDoesNotExist:
+            return obj.author.recipes.count()
+
+
+class IdListSerializer(serializers.Serializer):
+    """Сериализатор списка id для пакетных операций."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_SIZE,
+    )
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
+
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(TimedModelSerializer):
     """Сериализатор для вывода всех подписок."""
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
     author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
@@ -0,0 +1,50 @@
+import csv
+
+from django.db.models import Sum
+
+from recipes.models import Amount
+
+CSV_HEADER = ('Ингредиент', 'Кол-во')
+
+
+class Echo:
+    """Псевдо-буфер: csv.writer возвращает строку вместо записи в файл."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    """Суммарное количество ингредиентов из корзины одним запросом."""
+    return (
+        Amount.objects
+        .filter(recipe__buyers=user)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
+
+
+def iter_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in ingredients:
+        yield writer.writerow((
+            f'{item["ingredient__name"]}, '
+            f'{item["ingredient__measurement_unit"]}',
+            item['total'],
+        ))
+
+
+def iter_txt(ingredients):
+    yield 'Список покупок\n\n'
+    for item in ingredients:
+        yield (f'{item["ingredient__name"]} '
+               f'({item["ingredient__measurement_unit"]}) — '
+               f'{item["total"]}\n')
+
+
+FORMATS = {
+    'csv': ('text/csv', iter_csv),
+    'txt': ('text/plain; charset=utf-8', iter_txt),
+}
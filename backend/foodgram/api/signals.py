@@ -0,0 +1,173 @@
+import time
+from threading import local
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .cache import (bump_user_version, counters_cache, ingredients_cache,
+                    recipes_cache, tags_cache, token_cache)
+from recipes.events import (counters_updated, rankings_updated,
+                            thumbnail_created)
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.signals import is_m2m_removal
+from users.events import follows_created
+from users.models import Follow
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_cache(**kwargs):
+    tags_cache.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients_cache(**kwargs):
+    ingredients_cache.invalidate()
+
+
+def invalidate_recipes_on_commit():
+    # После коммита: иначе параллельный запрос успеет получить новую
+    # версию вместе со старыми данными
+    transaction.on_commit(recipes_cache.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver(thumbnail_created)
+@receiver(rankings_updated)
+def invalidate_recipes(**kwargs):
+    invalidate_recipes_on_commit()
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_author_recipes(created, update_fields=None, **kwargs):
+    """Имя и email автора выводятся в рецептах."""
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    invalidate_recipes_on_commit()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_recipes_on_commit()
+
+
+@receiver(m2m_changed, sender=Recipe.subscribers.through)
+@receiver(m2m_changed, sender=Recipe.buyers.through)
+def invalidate_user_recipes(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_user_version(instance.pk)
+    elif action == 'pre_clear':
+        for user_id in sender.objects.filter(recipe=instance).values_list(
+                'user_id', flat=True):
+            bump_user_version(user_id)
+    elif action in ('post_add', 'post_remove'):
+        for user_id in pk_set:
+            bump_user_version(user_id)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_user_relation(sender, instance, **kwargs):
+    """Связи, изменённые напрямую (админка, каскадное удаление), а не
+    через add(), remove() и clear()."""
+    if not is_m2m_removal(sender, instance.pk):
+        bump_user_version(instance.user_id)
+        invalidate_counters_on_commit()
+
+
+def invalidate_counters_on_commit():
+    transaction.on_commit(counters_cache.invalidate)
+
+
+@receiver(m2m_changed, sender=Favorite)
+@receiver(m2m_changed, sender=ShoppingCart)
+def invalidate_relation_counters(action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_counters_on_commit()
+
+
+@receiver(counters_updated)
+def invalidate_counters(**kwargs):
+    invalidate_counters_on_commit()
+
+
+@receiver(pre_save, sender=Favorite)
+@receiver(pre_save, sender=ShoppingCart)
+def invalidate_previous_user(sender, instance, **kwargs):
+    """В админке строку могут переназначить другому пользователю."""
+    if instance.pk is None:
+        return
+    user_id = sender.objects.filter(pk=instance.pk).values_list(
+        'user_id', flat=True).first()
+    if user_id is not None and user_id != instance.user_id:
+        bump_user_version(user_id)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_user_follows(instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+@receiver(follows_created)
+def invalidate_user_batch_follows(user_id, **kwargs):
+    bump_user_version(user_id)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(instance, **kwargs):
+    """Выход пользователя (djoser удаляет токен) и удаление токена."""
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(instance, update_fields=None, **kwargs):
+    """Смена пароля, блокировка и другие изменения пользователя."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key',
+                                                               flat=True):
+        token_cache.invalidate(key)
+
+
+# Время окончания последнего запроса по алиасам БД. Соединения Django
+# свои у каждого потока, поэтому и время хранится по потокам.
+connections_used = local()
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Закрывает разорванное постоянное соединение с БД до начала работы
+    запроса, чтобы он не упал на первом же запросе к базе (например,
+    после перезапуска PostgreSQL или pgbouncer).
+
+    Проверка — лишний запрос SELECT 1, поэтому соединение проверяется,
+    только если простаивало дольше DB_CONN_CHECK_IDLE секунд: недавно
+    использованное соединение почти всегда живо.
+    """
+    if not settings.DB_CONN_CHECK_IDLE:
+        return
+    last_used = getattr(connections_used, 'times', {})
+    now = time.monotonic()
+    for connection in connections.all():
+        if (connection.connection is not None
+                and now - last_used.get(connection.alias, 0)
+                > settings.DB_CONN_CHECK_IDLE
+                and not connection.is_usable()):
+            connection.close()
+
+
+@receiver(request_finished)
+def remember_connections_use(**kwargs):
+    connections_used.times = {
+        connection.alias: time.monotonic()
+        for connection in connections.all()
+        if connection.connection is not None
+    }
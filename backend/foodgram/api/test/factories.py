@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Amount, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+def create_user(username, **kwargs):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@foodgram.ru',
+        password='password',
+        first_name=kwargs.pop('first_name', 'Имя'),
+        last_name=kwargs.pop('last_name', 'Фамилия'),
+        **kwargs,
+    )
+
+
+def create_catalogue(tags=3, ingredients=6):
+    return (
+        [Tag.objects.create(name=f'Тег {i}', color=f'#0000{i:02d}',
+                            slug=f'tag{i}') for i in range(tags)],
+        [Ingredient.objects.create(name=f'ингредиент {i}',
+                                   measurement_unit='г')
+         for i in range(ingredients)],
+    )
+
+
+def create_recipes(authors, tags, ingredients, count):
+    """Рецепты по кругу от authors с разным набором тегов и ингредиентов."""
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            author=authors[i % len(authors)],
+            name=f'Рецепт {i}',
+            text='Описание рецепта',
+            cooking_time=10 + i,
+        )
+        recipe.tags.set(tags[:1 + i % len(tags)])
+        Amount.objects.bulk_create([
+            Amount(recipe=recipe, ingredient=ingredient, amount=j + 1)
+            for j, ingredient in enumerate(
+                ingredients[:2 + i % (len(ingredients) - 1)])
+        ])
+        recipes.append(recipe)
+    return recipes
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
@@ -0,0 +1,58 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from api.benchmark import SCENARIOS
+from api.management.commands.benchmark_api import percentile, summarize
+
+
+class SummaryTest(SimpleTestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([1, 2, 3], 50), 2)
+
+    def test_summarize(self):
+        results = [
+            {'timings': [3.0, 1.0], 'queries': 4, 'errors': 0,
+             'connections': 2},
+            {'timings': [2.0, 4.0], 'queries': 6, 'errors': 1,
+             'connections': 0},
+        ]
+        self.assertEqual(summarize(results, elapsed=2), {
+            'rps': 2.0, 'p50': 2.0, 'p95': 4.0, 'p99': 4.0, 'max': 4.0,
+            'queries': 6, 'connections': 0.5, 'errors': 1,
+        })
+
+
+class BenchmarkCommandTest(TransactionTestCase):
+    """Команды нагрузочного теста выполняются на небольшом наборе данных.
+
+    TransactionTestCase: клиенты работают в отдельных потоках со своими
+    соединениями и должны видеть созданные данные.
+    """
+
+    def test_benchmark_api(self):
+        call_command('seed_benchmark_data', users=5, recipes=20,
+                     favorites=3, cart=2, follows=2, stdout=StringIO())
+        # Пороги времени не проверяются: тест только запускает сценарии
+        thresholds = {name: {'p95_ms': 10 ** 6} for name in SCENARIOS}
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump(thresholds, file)
+            file.flush()
+            out = StringIO()
+            call_command('benchmark_api', requests=4,
+                         thresholds=file.name, stdout=out)
+        output = out.getvalue()
+        for name in SCENARIOS:
+            self.assertIn(name, output)
+        self.assertIn('Пороги не превышены', output)
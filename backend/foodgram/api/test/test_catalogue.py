@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from recipes.catalogue import upsert
+from recipes.models import Tag
+
+
+class UpsertTest(TestCase):
+
+    def setUp(self):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def test_stats(self):
+        rows = [
+            # Совпадает с сохранённым
+            {'slug': 'breakfast', 'name': 'Завтрак', 'color': '#E26C2D'},
+            # Новый slug, но название уже занято: база отбросит строку
+            {'slug': 'morning', 'name': 'Завтрак', 'color': '#000000'},
+            {'slug': 'dinner', 'name': 'Ужин', 'color': '#8775D2'},
+            # Повтор внутри файла и строка без обязательного поля
+            {'slug': 'dinner', 'name': 'Ужин', 'color': '#8775D2'},
+            {'slug': 'lunch', 'name': '', 'color': '#49B64E'},
+        ]
+        stats = upsert(Tag, rows, ('slug',), ('name', 'color'))
+        self.assertEqual(stats, {'inserted': 1, 'updated': 0, 'skipped': 4})
+        self.assertEqual(sorted(Tag.objects.values_list('slug', flat=True)),
+                         ['breakfast', 'dinner'])
+
+    def test_update(self):
+        rows = [{'slug': 'breakfast', 'name': 'Завтрак', 'color': '#FFFFFF'}]
+        stats = upsert(Tag, rows, ('slug',), ('name', 'color'))
+        self.assertEqual(stats, {'inserted': 0, 'updated': 1, 'skipped': 0})
+        self.assertEqual(Tag.objects.get().color, '#FFFFFF')
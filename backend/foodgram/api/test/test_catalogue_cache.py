@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .factories import create_catalogue, get_client
+from api.cache import ingredients_cache, tags_cache
+
+
+class CatalogueCacheKeyTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, cls.ingredients = create_catalogue()
+
+    def setUp(self):
+        cache.clear()
+        for catalogue in (tags_cache, ingredients_cache):
+            catalogue._local.clear()
+        self.client = get_client()
+
+    def get(self, url):
+        result = self.client.get(url)
+        self.assertEqual(result.status_code, 200)
+        return result.json()
+
+    def test_unrelated_params_share_key(self):
+        data = self.get('/api/ingredients/?name=ингредиент 1')
+        self.assertEqual([item['name'] for item in data], ['ингредиент 1'])
+        with self.assertNumQueries(0):
+            for url in ('/api/ingredients/?name=ингредиент 1&_=123',
+                        '/api/ingredients/?utm=x&name=ингредиент%201'):
+                self.assertEqual(self.get(url), data)
+        self.assertEqual(len(ingredients_cache._local), 1)
+
+    def test_blank_name_is_full_list(self):
+        data = self.get('/api/ingredients/?name=%20')
+        self.assertEqual(len(data), len(self.ingredients))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/ingredients/'), data)
+
+    def test_list_and_detail_keys(self):
+        tags = self.get('/api/tags/?page=2')
+        self.assertEqual(len(tags), len(self.tags))
+        tag = self.get(f'/api/tags/{self.tags[0].pk}/')
+        self.assertEqual(tag['slug'], self.tags[0].slug)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/tags/'), tags)
+            self.assertEqual(self.get(f'/api/tags/{self.tags[0].pk}/?x=1'),
+                             tag)
@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from api.signals import (check_persistent_connections, connections_used,
+                         remember_connections_use)
+
+
+@override_settings(DB_CONN_CHECK_IDLE=30)
+class PersistentConnectionCheckTest(TestCase):
+    """Соединение проверяется в начале запроса, только если долго
+    простаивало."""
+
+    def check(self, idle, usable=False):
+        remember_connections_use()
+        with mock.patch('api.signals.time.monotonic',
+                        return_value=connections_used.times[
+                            connection.alias] + idle), \
+                mock.patch.object(connection, 'is_usable',
+                                  return_value=usable) as is_usable, \
+                mock.patch.object(connection, 'close') as close:
+            check_persistent_connections()
+        return is_usable.called, close.called
+
+    def test_recently_used_not_checked(self):
+        self.assertEqual(self.check(idle=5), (False, False))
+
+    def test_idle_broken_connection_closed(self):
+        self.assertEqual(self.check(idle=60), (True, True))
+
+    def test_idle_usable_connection_kept(self):
+        self.assertEqual(self.check(idle=60, usable=True), (True, False))
+
+    @override_settings(DB_CONN_CHECK_IDLE=0)
+    def test_disabled(self):
+        self.assertEqual(self.check(idle=60), (False, False))
@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from recipes.feed import FEED_ORDERING, fan_out_recipe
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+
+@override_settings(FEED_MAX_SIZE=3)
+class FeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.user = create_user('reader')
+        cls.catalogue = create_catalogue()
+        cls.recipes = create_recipes([cls.author], *cls.catalogue, 5)
+        # Одинаковое время создания: порядок в ленте задаёт recipe_id
+        Recipe.objects.update(time_create=timezone.now())
+
+    def setUp(self):
+        self.client = get_client(self.user)
+
+    def get_feed(self):
+        return list(FeedEntry.objects.filter(user=self.user).order_by(
+            *FEED_ORDERING).values_list('recipe_id', flat=True))
+
+    def subscribe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.client.post(
+                f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(result.status_code, 201)
+
+    def test_subscribe_trims_ties_by_recipe_id(self):
+        self.subscribe()
+        ids = sorted((recipe.pk for recipe in self.recipes), reverse=True)
+        self.assertEqual(self.get_feed(), ids[:3])
+
+    def test_new_recipe_fanned_out_after_commit(self):
+        self.subscribe()
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe, = create_recipes([self.author], *self.catalogue, 1)
+            self.assertNotIn(recipe.pk, self.get_feed())
+        for callback in callbacks:
+            callback()
+        feed = self.get_feed()
+        self.assertEqual(len(feed), 3)
+        self.assertEqual(feed[0], recipe.pk)
+
+    def fan_out_queries(self, followers):
+        """Запросы рассылки рецепта, когда у автора followers подписчиков."""
+        start = Follow.objects.filter(author=self.author).count()
+        for number in range(start, followers):
+            Follow.objects.create(user=create_user(f'follower{number}'),
+                                  author=self.author)
+        recipe, = create_recipes([self.author], *self.catalogue, 1)
+        with CaptureQueriesContext(connection) as queries:
+            fan_out_recipe(recipe.pk)
+        self.assertEqual(
+            FeedEntry.objects.filter(recipe=recipe).count(), followers)
+        return len(queries)
+
+    def test_fan_out_queries_do_not_depend_on_followers(self):
+        few = self.fan_out_queries(2)
+        self.assertEqual(self.fan_out_queries(20), few)
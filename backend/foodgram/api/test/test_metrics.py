@@ -0,0 +1,61 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+
+WORKER = '''
+from prometheus_client import Histogram
+Histogram('foodgram_worker_seconds', '', ['view']).labels(
+    'recipes-list').observe(1)
+'''
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsTest(TestCase):
+
+    def get_metrics(self):
+        result = self.client.get('/metrics/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(result.status_code, 200)
+        return result.content.decode()
+
+    def test_request_observed(self):
+        get_client(create_user('reader')).get('/api/tags/')
+        self.assertIn(
+            'foodgram_request_duration_seconds_count{method="GET",'
+            'status="2xx",view="tags-list"}', self.get_metrics())
+
+    def test_serializer_phase(self):
+        author = create_user('author')
+        tags, ingredients = create_catalogue()
+        create_recipes([author], tags, ingredients, 5)
+        result = get_client(author).get('/api/recipes/')
+        timing = dict(re.findall(r'(\w+);(?:desc="[^"]*";)?dur=([\d.]+)',
+                                 result['Server-Timing']))
+        self.assertGreater(float(timing['serializer']), 0)
+        self.assertLess(float(timing['serializer']), float(timing['total']))
+        self.assertIn(
+            'foodgram_request_serializer_duration_seconds_count{'
+            'method="GET",status="2xx",view="recipes-list"}',
+            self.get_metrics())
+
+    def test_forbidden_address(self):
+        result = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(result.status_code, 404)
+
+    def test_other_worker_metrics(self):
+        """Значения других воркеров читаются из PROMETHEUS_MULTIPROC_DIR."""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+            subprocess.run([sys.executable, '-c', WORKER], env=env,
+                           check=True)
+            with mock.patch.dict(os.environ, env):
+                content = self.get_metrics()
+        self.assertIn('foodgram_worker_seconds_count{view="recipes-list"} '
+                      '1.0', content)
@@ -0,0 +1,61 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from recipes.models import Recipe
+
+
+class RankingOrderingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        catalogue = create_catalogue()
+        users = [create_user(f'user{i}') for i in range(5)]
+        recipes = create_recipes([author], *catalogue, 4)
+        now = timezone.now()
+        # (возраст, в избранном, в списках покупок)
+        activity = (
+            (timedelta(days=3), 3, 0),
+            (timedelta(hours=1), 1, 1),
+            # За пределами TRENDING_WINDOW_DAYS
+            (timedelta(days=30), 5, 0),
+            (timedelta(0), 0, 0),
+        )
+        for recipe, (age, favorites, carts) in zip(recipes, activity):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                time_create=now - age)
+            for user in users[:favorites]:
+                user.favorites.add(recipe)
+            for user in users[:carts]:
+                user.shopping_cart.add(recipe)
+        call_command('update_rankings', stdout=StringIO())
+        # Рецепт без рейтинга до следующего запуска update_rankings
+        recipes += create_recipes([author], *catalogue, 1)
+        cls.ids = [recipe.pk for recipe in recipes]
+
+    def get_ids(self, ordering):
+        result = get_client().get('/api/recipes/', {'ordering': ordering})
+        self.assertEqual(result.status_code, 200)
+        return [recipe['id'] for recipe in result.json()['results']]
+
+    def test_popular(self):
+        first, second, third, fourth, new = self.ids
+        self.assertEqual(self.get_ids('popular'),
+                         [third, first, second, fourth, new])
+
+    def test_trending(self):
+        first, second, third, fourth, new = self.ids
+        # Рецепты с нулевым рейтингом — по дате создания
+        self.assertEqual(self.get_ids('trending'),
+                         [second, first, fourth, third, new])
+
+    def test_unknown_ordering(self):
+        result = get_client().get('/api/recipes/', {'ordering': 'random'})
+        self.assertEqual(result.status_code, 400)
+        self.assertIn('ordering', result.json())
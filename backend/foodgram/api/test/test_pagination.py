@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+
+
+class KeysetPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        tags, ingredients = create_catalogue()
+        cls.recipes = create_recipes([author], tags, ingredients, 8)
+
+    def test_pages_follow_default_ordering(self):
+        client = get_client()
+        result = client.get('/api/recipes/?pagination=cursor&limit=5').json()
+        ids = [recipe['id'] for recipe in result['results']]
+        result = client.get(result['next']).json()
+        ids += [recipe['id'] for recipe in result['results']]
+        self.assertIsNone(result['next'])
+        self.assertEqual(ids, [recipe.pk for recipe in self.recipes[::-1]])
+
+    def test_custom_ordering_rejected(self):
+        client = get_client()
+        for query in ('ordering=popular', 'search=Рецепт'):
+            with self.subTest(query=query):
+                result = client.get(f'/api/recipes/?pagination=cursor&{query}')
+                self.assertEqual(result.status_code, 400)
+                self.assertIn('pagination', result.json())
+                result = client.get(f'/api/recipes/?{query}')
+                self.assertEqual(result.status_code, 200)
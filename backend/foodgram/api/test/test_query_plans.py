@@ -0,0 +1,34 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .factories import create_catalogue, create_recipes, create_user
+from recipes.models import Recipe
+from users.models import Follow
+
+
+class QueryPlansTest(TestCase):
+    """Горячие запросы API используют индексы (check_query_plans)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [create_user(f'author{i}') for i in range(2)]
+        tags, ingredients = create_catalogue()
+        recipes = create_recipes(authors, tags, ingredients, 10)
+        user = create_user('reader')
+        user.favorites.add(*recipes[:3])
+        user.shopping_cart.add(*recipes[2:5])
+        Follow.objects.create(user=user, author=authors[0])
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        try:
+            call_command('check_query_plans', stdout=out)
+        except CommandError as error:
+            self.fail(f'{error}\n{out.getvalue()}')
+
+    def test_missing_data(self):
+        Recipe.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('check_query_plans', stdout=StringIO())
@@ -0,0 +1,164 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from recipes.models import Recipe
+
+
+class RecipeConditionalGetTest(TestCase):
+    """С общим кэшем авторизованные запросы получают 304."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.settings_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.'
+                       'FileBasedCache',
+            'LOCATION': cls.cache_dir,
+        }})
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.user = create_user('reader')
+        tags, ingredients = create_catalogue()
+        cls.recipe, = create_recipes([cls.author], tags, ingredients, 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_list_not_modified_until_recipe_changes(self):
+        url = '/api/recipes/'
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = get_client(self.author).patch(
+                f'/api/recipes/{self.recipe.pk}/', {'name': 'Новое название'},
+                format='json')
+        self.assertEqual(result.status_code, 200)
+        result = self.get(url, etag)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json()['results'][0]['name'],
+                         'Новое название')
+
+    def test_list_etag_follows_counters(self):
+        url = '/api/recipes/'
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url)['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = get_client(self.author).post(
+                f'{url}{self.recipe.pk}/shopping_cart/')
+        self.assertEqual(result.status_code, 201)
+        result = self.get(url, etag)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json()['results'][0]['shopping_cart_count'],
+                         1)
+
+    def test_favorite_updates_counter_but_not_time_modify(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        time_modify = Recipe.objects.get(pk=self.recipe.pk).time_modify
+        etag = self.get(url)['ETag']
+
+        result = get_client(self.author).post(f'{url}favorite/')
+        self.assertEqual(result.status_code, 201)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).time_modify, time_modify)
+        result = self.get(url, etag)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json()['favorites_count'], 1)
+
+    def test_author_change_invalidates_fragment(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.assertEqual(self.get(url).json()['author']['first_name'], 'Имя')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Новое имя'
+            self.author.save()
+        for url in (url, '/api/recipes/'):
+            with self.subTest(url=url):
+                data = self.get(url).json()
+                data = data['results'][0] if 'results' in data else data
+                self.assertEqual(data['author']['first_name'], 'Новое имя')
+
+
+class LocalCacheConditionalGetTest(TestCase):
+    """С LocMemCache авторизованным пользователям 304 не отдаётся."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        tags, ingredients = create_catalogue()
+        create_recipes([create_user('author')], tags, ingredients, 1)
+
+    def test_authenticated_not_conditional(self):
+        client = get_client(self.user)
+        result = client.get('/api/recipes/')
+        self.assertNotIn('ETag', result)
+        self.assertIn('no-cache', result['Cache-Control'])
+
+    def test_anonymous_conditional(self):
+        client = get_client()
+        etag = client.get('/api/recipes/')['ETag']
+        result = client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(result.status_code, 304)
+
+
+class AmountAdminTest(TestCase):
+    """Изменение ингредиентов в админке обновляет кэш представлений."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        tags, cls.ingredients = create_catalogue()
+        cls.recipe, = create_recipes([cls.admin], tags, cls.ingredients, 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.api_client = get_client()
+
+    def get_amounts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.api_client.get(
+                f'/api/recipes/{self.recipe.pk}/').json()
+        return {item['id']: item['amount'] for item in data['ingredients']}
+
+    def test_change_and_delete(self):
+        amounts = self.get_amounts()
+        amount = self.recipe.amount.order_by('pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.client.post(
+                f'/admin/recipes/amount/{amount.pk}/change/', {
+                    'recipe': self.recipe.pk,
+                    'ingredient': amount.ingredient_id,
+                    'amount': 100,
+                })
+        self.assertEqual(result.status_code, 302)
+        amounts[amount.ingredient_id] = 100
+        self.assertEqual(self.get_amounts(), amounts)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.client.post(
+                f'/admin/recipes/amount/{amount.pk}/delete/',
+                {'post': 'yes'})
+        self.assertEqual(result.status_code, 302)
+        del amounts[amount.ingredient_id]
+        self.assertEqual(self.get_amounts(), amounts)
@@ -0,0 +1,115 @@
+import base64
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .factories import create_catalogue, create_user, get_client
+from recipes.models import Recipe
+
+
+def encode_image(color='red', image_format='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, image_format)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class RecipeImageTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media_root, IMAGE_PROCESSING_ASYNC=False,
+        )
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags, cls.ingredients = create_catalogue()
+
+    def setUp(self):
+        self.client = get_client(self.author)
+
+    def post_recipe(self, image):
+        return self.client.post('/api/recipes/', {
+            'tags': [self.tags[0].pk],
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+            'name': 'Рецепт',
+            'image': image,
+            'text': 'Описание',
+            'cooking_time': 5,
+        }, format='json')
+
+    def assert_image_rejected(self, image):
+        with mock.patch('recipes.images.schedule_thumbnail') as schedule:
+            result = self.post_recipe(image)
+        self.assertEqual(result.status_code, 400)
+        self.assertIn('image', result.json())
+        schedule.assert_not_called()
+        self.assertFalse(Recipe.objects.exists())
+        return result.json()['image']
+
+    def test_thumbnail_created(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.post_recipe(
+                f'data:image/png;base64,{encode_image()}')
+        self.assertEqual(result.status_code, 201)
+        recipe = Recipe.objects.get()
+        self.assertTrue(recipe.image.name.endswith('.png'))
+        self.assertTrue(recipe.thumbnail)
+        self.assertEqual(result.json()['image'].split('/')[-1],
+                         recipe.image.name.split('/')[-1])
+
+    def test_line_breaks_allowed(self):
+        data = encode_image()
+        data = '\n'.join(data[i:i + 76] for i in range(0, len(data), 76))
+        self.assertEqual(self.post_recipe(data).status_code, 201)
+
+    def test_invalid_base64(self):
+        self.assert_image_rejected('не base64!')
+
+    def test_not_an_image(self):
+        self.assert_image_rejected(
+            base64.b64encode(b'<svg></svg>' * 10).decode())
+
+    def test_unsupported_format(self):
+        self.assert_image_rejected(encode_image(image_format='BMP'))
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=64)
+    def test_oversized(self):
+        errors = self.assert_image_rejected(encode_image())
+        self.assertIn('64', errors[0])
+
+    def test_thumbnail_updated_only_with_new_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_recipe(encode_image())
+        recipe = Recipe.objects.get()
+        url = f'/api/recipes/{recipe.pk}/'
+
+        with mock.patch('recipes.images.schedule_thumbnail') as schedule:
+            result = self.client.patch(url, {'name': 'Новое название'},
+                                       format='json')
+        self.assertEqual(result.status_code, 200)
+        schedule.assert_not_called()
+        self.assertEqual(Recipe.objects.get().thumbnail, recipe.thumbnail)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.client.patch(
+                url, {'image': encode_image('blue')}, format='json')
+        self.assertEqual(result.status_code, 200)
+        updated = Recipe.objects.get()
+        self.assertNotEqual(updated.image, recipe.image)
+        self.assertTrue(updated.thumbnail)
+        self.assertNotEqual(updated.thumbnail, recipe.thumbnail)
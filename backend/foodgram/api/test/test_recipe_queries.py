@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from users.models import Follow
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов к базе для списка рецептов не зависит от размера
+    страницы: автор, теги и ингредиенты подгружаются пачкой, флаги
+    пользователя — аннотациями."""
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [create_user(f'author{i}') for i in range(3)]
+        tags, ingredients = create_catalogue()
+        recipes = create_recipes(authors, tags, ingredients, 110)
+        cls.user = create_user('reader')
+        cls.user.favorites.add(*recipes[:10])
+        cls.user.shopping_cart.add(*recipes[5:15])
+        Follow.objects.create(user=cls.user, author=authors[0])
+
+    def assert_list_queries(self, client, limit, queries):
+        cache.clear()
+        with self.assertNumQueries(queries):
+            result = client.get(f'/api/recipes/?limit={limit}')
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(result.json()['results']), limit)
+
+    def test_anonymous_list(self):
+        client = get_client()
+        for limit in (6, 100):
+            with self.subTest(limit=limit):
+                self.assert_list_queries(client, limit, 4)
+
+    def test_authenticated_list(self):
+        client = get_client()
+        client.force_authenticate(self.user)
+        for limit in (6, 100):
+            with self.subTest(limit=limit):
+                self.assert_list_queries(client, limit, 4)
@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .factories import create_catalogue, create_user, get_client
+from recipes.models import Amount, Recipe
+
+
+class RecipeAmountsUpdateTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags, cls.ingredients = create_catalogue()
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание',
+            cooking_time=10)
+        cls.recipe.tags.set(cls.tags[:1])
+        Amount.objects.bulk_create(
+            Amount(recipe=cls.recipe, ingredient=ingredient, amount=amount)
+            for ingredient, amount in zip(cls.ingredients, (1, 2, 3))
+        )
+
+    def get_amounts(self):
+        return {amount.ingredient_id: (amount.pk, amount.amount)
+                for amount in self.recipe.amount.all()}
+
+    def patch(self, amounts):
+        result = get_client(self.author).patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {'ingredients': [{'id': ingredient_id, 'amount': amount}
+                             for ingredient_id, amount in amounts]},
+            format='json')
+        self.assertEqual(result.status_code, 200)
+        return result.json()
+
+    def test_only_changed_rows_written(self):
+        first, second, third, fourth = self.ingredients[:4]
+        before = self.get_amounts()
+
+        data = self.patch([(first.pk, 1), (second.pk, 5), (fourth.pk, 4)])
+        after = self.get_amounts()
+        self.assertEqual(after[first.pk], before[first.pk])
+        self.assertEqual(after[second.pk], (before[second.pk][0], 5))
+        self.assertNotIn(third.pk, after)
+        self.assertNotIn(after[fourth.pk][0],
+                         [pk for pk, _ in before.values()])
+        self.assertEqual(after[fourth.pk][1], 4)
+        self.assertEqual(
+            {item['id']: item['amount'] for item in data['ingredients']},
+            {first.pk: 1, second.pk: 5, fourth.pk: 4})
+
+    def test_same_ingredients_not_rewritten(self):
+        before = self.get_amounts()
+        with CaptureQueriesContext(connection) as context:
+            self.patch([(ingredient_id, amount) for ingredient_id, (_, amount)
+                        in before.items()])
+        writes = [query['sql'] for query in context
+                  if '"recipes_amount"' in query['sql']
+                  and not query['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+        self.assertEqual(self.get_amounts(), before)
+
+    def test_duplicate_ingredient_rejected(self):
+        first = self.ingredients[0]
+        result = get_client(self.author).patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {'ingredients': [{'id': first.pk, 'amount': 1},
+                             {'id': first.pk, 'amount': 2}]},
+            format='json')
+        self.assertEqual(result.status_code, 400)
+        self.assertEqual(len(self.get_amounts()), 3)
@@ -0,0 +1,140 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .factories import create_catalogue, create_recipes, create_user
+from api.cache import get_user_version
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+class AdminInlineCountersTest(TestCase):
+    """Инлайны избранного и корзины в админке обновляют счётчики рецепта
+    и версии пользователей так же, как add() и remove()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        cls.users = [create_user(f'reader{i}') for i in range(3)]
+        tags, ingredients = create_catalogue()
+        cls.tags = tags
+        cls.recipe, = create_recipes([cls.admin], tags, ingredients, 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = f'/admin/recipes/recipe/{self.recipe.pk}/change/'
+
+    def get_inline_data(self, prefix, rows):
+        """rows — список (объект связи или None, id пользователя, удалить)."""
+        data = {
+            f'{prefix}-TOTAL_FORMS': len(rows),
+            f'{prefix}-INITIAL_FORMS': sum(obj is not None
+                                           for obj, *_ in rows),
+            f'{prefix}-MIN_NUM_FORMS': 0,
+            f'{prefix}-MAX_NUM_FORMS': 1000,
+        }
+        for number, (obj, user, delete) in enumerate(rows):
+            data[f'{prefix}-{number}-recipe'] = self.recipe.pk
+            data[f'{prefix}-{number}-user'] = user.pk
+            if obj is not None:
+                data[f'{prefix}-{number}-id'] = obj.pk
+            if delete:
+                data[f'{prefix}-{number}-DELETE'] = 'on'
+        return data
+
+    def post(self, favorites=(), shopping_cart=()):
+        data = {
+            'author': self.admin.pk,
+            'name': self.recipe.name,
+            'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'tags': [tag.pk for tag in self.tags[:1]],
+            **self.get_inline_data('favorite_set', favorites),
+            **self.get_inline_data('shoppingcart_set', shopping_cart),
+        }
+        self.assertEqual(self.client.post(self.url, data).status_code, 302)
+
+    def assert_counts(self, favorites, shopping_cart):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(
+            (recipe.favorites_count, recipe.shopping_cart_count),
+            (favorites, shopping_cart),
+        )
+        self.assertEqual(recipe.favorites_count, Favorite.objects.count())
+        self.assertEqual(recipe.shopping_cart_count,
+                         ShoppingCart.objects.count())
+
+    def test_add_change_and_delete_rows(self):
+        first, second, third = self.users
+        versions = [get_user_version(user.pk) for user in self.users]
+        self.post(favorites=[(None, first, False), (None, second, False)],
+                  shopping_cart=[(None, first, False)])
+        self.assert_counts(2, 1)
+        self.assertNotEqual(get_user_version(first.pk), versions[0])
+        self.assertNotEqual(get_user_version(second.pk), versions[1])
+
+        versions = [get_user_version(user.pk) for user in self.users]
+        first_favorite = Favorite.objects.get(user=first)
+        second_favorite = Favorite.objects.get(user=second)
+        self.post(
+            favorites=[(first_favorite, first, True),
+                       (second_favorite, third, False)],
+            shopping_cart=[(ShoppingCart.objects.get(), first, False)],
+        )
+        self.assert_counts(1, 1)
+        for user, version in zip(self.users, versions):
+            self.assertNotEqual(get_user_version(user.pk), version)
+
+
+class RelationCountersTest(TestCase):
+    """Счётчики и версии пользователя меняются ровно один раз при любом
+    способе изменения связей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        tags, ingredients = create_catalogue()
+        cls.recipes = create_recipes([cls.author], tags, ingredients, 2)
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('reader')
+
+    def assert_counts(self, favorites, shopping_cart):
+        self.assertEqual(
+            [(recipe.favorites_count, recipe.shopping_cart_count)
+             for recipe in Recipe.objects.order_by('pk')],
+            [(favorites, shopping_cart)] * len(self.recipes),
+        )
+
+    def assert_version_changed(self, change):
+        version = get_user_version(self.user.pk)
+        change()
+        self.assertNotEqual(get_user_version(self.user.pk), version)
+
+    def test_related_managers(self):
+        self.assert_version_changed(
+            lambda: self.user.favorites.add(*self.recipes))
+        for recipe in self.recipes:
+            recipe.buyers.add(self.user)
+        self.assert_counts(1, 1)
+        self.assert_version_changed(
+            lambda: self.user.favorites.remove(*self.recipes))
+        self.assert_version_changed(self.recipes[0].buyers.clear)
+        self.assert_version_changed(self.user.shopping_cart.clear)
+        self.assert_counts(0, 0)
+
+    def test_through_models(self):
+        for recipe in self.recipes:
+            self.assert_version_changed(lambda: Favorite.objects.create(
+                user=self.user, recipe=recipe))
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        self.assert_counts(1, 1)
+        for favorite in Favorite.objects.all():
+            self.assert_version_changed(favorite.delete)
+        self.assert_counts(0, 1)
+
+    def test_user_deleted(self):
+        self.user.favorites.add(*self.recipes)
+        self.user.shopping_cart.add(*self.recipes)
+        self.user.delete()
+        self.assert_counts(0, 0)
@@ -0,0 +1,55 @@
+import datetime
+import decimal
+import uuid
+from unittest import skipIf
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from api.renderers import FastJSONRenderer, orjson
+from recipes.models import Recipe
+
+
+@skipIf(orjson is None, 'orjson не установлен')
+class FastJSONRendererTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author', first_name='Имя\u2028автора')
+        recipes = create_recipes([author], *create_catalogue(), 3)
+        Recipe.objects.filter(pk=recipes[0].pk).update(
+            name='Строка\u2028и абзац\u2029', text='"кавычки" \\ и \t\n')
+
+    def assert_same_output(self, data):
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_recipe_list(self):
+        result = get_client(create_user('reader')).get('/api/recipes/')
+        self.assertEqual(result.status_code, 200)
+        self.assertIn(b'\\u2028', result.content)
+        self.assertIn(b'\\u2029', result.content)
+        self.assertEqual(result.content, JSONRenderer().render(result.data))
+        self.assert_same_output(result.data)
+
+    def test_encoder_types(self):
+        self.assert_same_output({
+            'date': datetime.date(2024, 1, 2),
+            'datetime': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456,
+                                          tzinfo=datetime.timezone.utc),
+            'time': datetime.time(3, 4, 5),
+            'timedelta': datetime.timedelta(hours=1),
+            'decimal': decimal.Decimal('1.50'),
+            'uuid': uuid.UUID(int=1),
+            'float': 0.1,
+            1: 'ключ-число',
+            'nested': [None, True, '\u2029'],
+        })
+
+    def test_indent_uses_default_renderer(self):
+        data = {'name': 'Рецепт'}
+        media_type = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(data, media_type),
+                         JSONRenderer().render(data, media_type))
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from .factories import create_user, get_client
+from recipes.models import Recipe
+from recipes.search import fill_search_index, search_recipes
+
+
+class RecipeSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.in_text = cls.create_recipe('Суп', 'Густой борщ на говядине')
+        cls.in_name = cls.create_recipe('Борщ', 'Суп на говядине')
+        cls.other = cls.create_recipe('Салат', 'Овощи и зелень')
+
+    @classmethod
+    def create_recipe(cls, name, text):
+        return Recipe.objects.create(author=cls.author, name=name, text=text,
+                                     cooking_time=10)
+
+    def search(self, text):
+        result = get_client().get('/api/recipes/', {'search': text})
+        self.assertEqual(result.status_code, 200)
+        return [recipe['id'] for recipe in result.json()['results']]
+
+    def test_name_ranked_above_text(self):
+        self.assertEqual(self.search('борщ'),
+                         [self.in_name.pk, self.in_text.pk])
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search('гов суп'),
+                         [self.in_text.pk, self.in_name.pk])
+        self.assertEqual(self.search('борщ зелень'), [])
+
+    def test_index_follows_changes(self):
+        self.other.name = 'Борщ холодный'
+        self.other.save()
+        self.in_name.delete()
+        self.assertEqual(self.search('борщ'),
+                         [self.other.pk, self.in_text.pk])
+
+    def test_bulk_created_recipes_filled(self):
+        recipe, = Recipe.objects.bulk_create([Recipe(
+            author=self.author, name='Борщ постный', text='Без мяса',
+            cooking_time=10,
+        )])
+        if recipe.pk is None:
+            recipe = Recipe.objects.get(name='Борщ постный')
+        self.assertNotIn(recipe.pk, self.search('постный'))
+        fill_search_index()
+        self.assertEqual(self.search('постный'), [recipe.pk])
+
+    def test_quotes_escaped(self):
+        self.assertEqual(self.search('"борщ'),
+                         [self.in_name.pk, self.in_text.pk])
+
+    def test_fallback_without_full_text_search(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            found = search_recipes(Recipe.objects.all(), 'Борщ')
+            self.assertEqual(list(found), [self.in_name])
@@ -0,0 +1,67 @@
+from django.test import TestCase
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from recipes.models import Recipe
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        other = create_user('other')
+        recipes = create_recipes([cls.user], *create_catalogue(), 3)
+        # Ингредиенты 0 и 1 есть в обоих рецептах и суммируются
+        cls.user.shopping_cart.add(*recipes[:2])
+        other.shopping_cart.add(recipes[2])
+
+    def setUp(self):
+        self.client = get_client(self.user)
+
+    def download(self, file_format):
+        result = self.client.get(URL, {'type': file_format})
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(result.streaming)
+        self.assertEqual(
+            result['Content-Disposition'],
+            f'attachment; filename="ingredients.{file_format}"')
+        return result, b''.join(result.streaming_content).decode()
+
+    def test_csv(self):
+        result, content = self.download('csv')
+        self.assertEqual(result['Content-Type'], 'text/csv')
+        self.assertEqual(content, (
+            'Ингредиент,Кол-во\r\n'
+            '"ингредиент 0, г",2\r\n'
+            '"ингредиент 1, г",4\r\n'
+            '"ингредиент 2, г",3\r\n'
+        ))
+
+    def test_txt(self):
+        result, content = self.download('txt')
+        self.assertEqual(result['Content-Type'],
+                         'text/plain; charset=utf-8')
+        self.assertEqual(content, (
+            'Список покупок\n\n'
+            'ингредиент 0 (г) — 2\n'
+            'ингредиент 1 (г) — 4\n'
+            'ингредиент 2 (г) — 3\n'
+        ))
+
+    def test_cart_cleared_after_download(self):
+        self.download('csv')
+        self.assertFalse(self.user.shopping_cart.exists())
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('shopping_cart_count',
+                                              flat=True)),
+            [0, 0, 1])
+        _, content = self.download('csv')
+        self.assertEqual(content, 'Ингредиент,Кол-во\r\n')
+
+    def test_unknown_format(self):
+        result = self.client.get(URL, {'type': 'pdf'})
+        self.assertEqual(result.status_code, 400)
+        self.assertEqual(self.user.shopping_cart.count(), 2)
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.test import TestCase
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from recipes.models import FeedEntry
+from users.models import Follow
+
+URL = '/api/users/subscribe/batch/'
+
+
+class SubscribeBatchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{i}') for i in range(3)]
+        cls.recipes = create_recipes(cls.authors, *create_catalogue(), 3)
+
+    def setUp(self):
+        self.client = get_client(self.user)
+
+    def post(self, ids, method='post'):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = getattr(self.client, method)(URL, {'ids': ids},
+                                                  format='json')
+        self.assertEqual(result.status_code, 200)
+        return {item['id']: item['status']
+                for item in result.json()['results']}
+
+    def get_followed(self):
+        return set(Follow.objects.filter(user=self.user).values_list(
+            'author_id', flat=True))
+
+    def test_partial_duplicates(self):
+        first, second, third = (author.pk for author in self.authors)
+        Follow.objects.create(user=self.user, author_id=first)
+        statuses = self.post([first, second, second, self.user.pk, 999999])
+        self.assertEqual(statuses, {
+            first: 'already_subscribed',
+            second: 'subscribed',
+            self.user.pk: 'self',
+            999999: 'not_found',
+        })
+        self.assertEqual(self.get_followed(), {first, second})
+
+        statuses = self.post([second, third, 999999], method='delete')
+        self.assertEqual(statuses, {
+            second: 'unsubscribed',
+            third: 'not_subscribed',
+            999999: 'not_found',
+        })
+        self.assertEqual(self.get_followed(), {first})
+
+    def test_feed_and_viewer_state_updated(self):
+        url = f'/api/users/{self.authors[0].pk}/'
+        self.assertFalse(self.client.get(url).json()['is_subscribed'])
+
+        self.post([author.pk for author in self.authors[:2]])
+        feed = set(FeedEntry.objects.filter(user=self.user).values_list(
+            'recipe_id', flat=True))
+        self.assertEqual(feed, {recipe.pk for recipe in self.recipes[:2]})
+        self.assertTrue(self.client.get(url).json()['is_subscribed'])
+
+    def test_too_many_ids(self):
+        ids = [author.pk for author in self.authors]
+        ids += range(10 ** 6, 10 ** 6 + settings.BATCH_MAX_SIZE)
+        result = self.client.post(URL, {'ids': ids}, format='json')
+        self.assertEqual(result.status_code, 400)
+        self.assertIn('ids', result.json())
+        self.assertEqual(self.get_followed(), set())
+
+    def test_invalid_ids(self):
+        for ids in ([], ['x'], [0], 'not a list'):
+            with self.subTest(ids=ids):
+                result = self.client.post(URL, {'ids': ids}, format='json')
+                self.assertEqual(result.status_code, 400)
+        self.assertEqual(self.get_followed(), set())
@@ -0,0 +1,70 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from users.models import Follow
+
+URL = '/api/users/subscriptions/'
+
+
+class SubscriptionRecipesLimitTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.catalogue = create_catalogue()
+        cls.recipes = {}
+        for count in (1, 3, 5):
+            cls.add_author(count)
+
+    @classmethod
+    def add_author(cls, recipes_count):
+        author = create_user(f'author{len(cls.recipes)}')
+        recipes = create_recipes([author], *cls.catalogue, recipes_count)
+        cls.recipes[author.pk] = [recipe.pk for recipe in reversed(recipes)]
+        Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        self.client = get_client(self.user)
+
+    def get(self, **params):
+        result = self.client.get(URL, params)
+        self.assertEqual(result.status_code, 200)
+        return result.json()['results']
+
+    def test_latest_recipes_limited(self):
+        for limit in (0, 2, 10):
+            with self.subTest(limit=limit):
+                subscriptions = self.get(recipes_limit=limit)
+                self.assertEqual(len(subscriptions), len(self.recipes))
+                for item in subscriptions:
+                    recipes = self.recipes[item['id']]
+                    self.assertEqual(
+                        [recipe['id'] for recipe in item['recipes']],
+                        recipes[:limit])
+                    self.assertEqual(item['recipes_count'], len(recipes))
+
+    def test_without_limit(self):
+        for item in self.get():
+            self.assertEqual([recipe['id'] for recipe in item['recipes']],
+                             self.recipes[item['id']])
+
+    def test_invalid_limit(self):
+        for limit in ('-1', 'x'):
+            with self.subTest(limit=limit):
+                result = self.client.get(URL, {'recipes_limit': limit})
+                self.assertEqual(result.status_code, 400)
+                self.assertIn('recipes_limit', result.json())
+
+    def test_queries_do_not_grow_with_authors(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.get(recipes_limit=2)
+            return len(context)
+
+        queries = count_queries()
+        for count in (2, 4, 6):
+            self.add_author(count)
+        self.assertEqual(count_queries(), queries)
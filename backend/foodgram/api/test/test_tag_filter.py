@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+
+
+class TagFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.tags, ingredients = create_catalogue()
+        # У рецепта i первые 1 + i % 3 тегов
+        cls.recipes = create_recipes([author], cls.tags, ingredients, 6)
+
+    def get(self, tags):
+        return get_client().get('/api/recipes/', {'tags': tags,
+                                                  'limit': 100})
+
+    def get_ids(self, tags):
+        result = self.get(tags)
+        self.assertEqual(result.status_code, 200)
+        data = result.json()
+        ids = [recipe['id'] for recipe in data['results']]
+        self.assertEqual(data['count'], len(ids))
+        return ids
+
+    def test_several_tags_without_duplicates(self):
+        ids = self.get_ids([tag.slug for tag in self.tags])
+        self.assertEqual(ids, [recipe.pk for recipe in self.recipes[::-1]])
+
+    def test_any_of_tags(self):
+        ids = self.get_ids([self.tags[1].slug, self.tags[2].slug])
+        self.assertEqual(ids, [recipe.pk for i, recipe
+                               in reversed(list(enumerate(self.recipes)))
+                               if i % 3])
+
+    def test_unknown_slug(self):
+        result = self.get([self.tags[0].slug, 'unknown'])
+        self.assertEqual(result.status_code, 400)
+        self.assertIn('tags', result.json())
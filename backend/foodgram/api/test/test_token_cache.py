@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from .factories import create_user, get_client
+from api.cache import token_cache
+
+
+class TokenCacheTest(TestCase):
+    """С общим кэшем отозванный токен перестаёт работать сразу."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.settings_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.'
+                       'FileBasedCache',
+            'LOCATION': cls.cache_dir,
+        }})
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.user = create_user('reader')
+        self.client = get_client(self.user)
+
+    def assert_cached(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        key = Token.objects.get(user=self.user).key
+        self.assertIsNotNone(token_cache.get(key))
+        with self.assertNumQueries(0):
+            self.client.get('/api/users/me/')
+        return key
+
+    def test_logout_revokes_token(self):
+        self.assert_cached()
+        result = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(result.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_deactivation_revokes_token(self):
+        self.assert_cached()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_inactive_cached_user_rejected(self):
+        key = self.assert_cached()
+        self.user.is_active = False
+        token_cache.set(key, self.user)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+        self.assertIsNone(token_cache.get(key))
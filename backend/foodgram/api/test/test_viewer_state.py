@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .factories import (create_catalogue, create_recipes, create_user,
+                        get_client)
+from api.cache import get_user_version_key
+from api.viewer import ViewerState
+from recipes.models import Favorite
+from users.models import Follow
+
+
+class StaleViewerStateTest(TestCase):
+    """Добавление и удаление проверяют связи по базе, а не по
+    закэшированному состоянию пользователя, которое в другом воркере
+    может быть устаревшим."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.user = create_user('reader')
+        tags, ingredients = create_catalogue()
+        cls.recipe, = create_recipes([cls.author], tags, ingredients, 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+        self.url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        state = ViewerState(self.user)
+        state.favorites, state.following
+
+    def change_elsewhere(self, change):
+        """Изменение, версию которого этот воркер ещё не видит."""
+        key = get_user_version_key(self.user.pk)
+        version = cache.get(key)
+        change()
+        cache.set(key, version)
+
+    def test_favorite_added_elsewhere(self):
+        self.change_elsewhere(lambda: self.user.favorites.add(self.recipe))
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_favorite_batch_added_elsewhere(self):
+        self.change_elsewhere(lambda: self.user.favorites.add(self.recipe))
+        result = self.client.post('/api/recipes/favorite/batch/',
+                                  {'ids': [self.recipe.pk]}, format='json')
+        self.assertEqual(result.json()['results'][0]['status'],
+                         'already_added')
+
+    def test_subscription_added_elsewhere(self):
+        self.change_elsewhere(lambda: Follow.objects.create(
+            user=self.user, author=self.author))
+        url = f'/api/users/{self.author.pk}/subscribe/'
+        result = self.client.post('/api/users/subscribe/batch/',
+                                  {'ids': [self.author.pk]}, format='json')
+        self.assertEqual(result.json()['results'][0]['status'],
+                         'already_subscribed')
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Follow.objects.exists())
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from .cache import get_user_version
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+QUERIES = {
+    'favorites': lambda user_id: Favorite.objects.filter(
+        user_id=user_id).values_list('recipe_id', flat=True),
+    'shopping_cart': lambda user_id: ShoppingCart.objects.filter(
+        user_id=user_id).values_list('recipe_id', flat=True),
+    'following': lambda user_id: Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True),
+}
+
+
+class ViewerState:
+    """Множества id избранных рецептов, рецептов в корзине и авторов,
+    на которых подписан текущий пользователь.
+
+    Каждое множество загружается одним запросом id (без самих объектов)
+    не больше раза за HTTP-запрос и кэшируется между запросами под
+    версией пользователя, которая меняется при любом изменении
+    избранного, корзины или подписок (см. api.signals). Множества
+    больше VIEWER_STATE_MAX_IDS в общий кэш не попадают.
+
+    С LocMemCache версия в других воркерах обновляется с задержкой (см.
+    get_version_timeout), поэтому состояние используется только для
+    флагов в ответах; добавление и удаление проверяют связи по базе.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._version = None
+        self._sets = {}
+
+    @property
+    def favorites(self):
+        return self._get('favorites')
+
+    @property
+    def shopping_cart(self):
+        return self._get('shopping_cart')
+
+    @property
+    def following(self):
+        return self._get('following')
+
+    def _get(self, kind):
+        if kind not in self._sets:
+            if self.user.is_authenticated:
+                self._sets[kind] = self._load(kind)
+            else:
+                self._sets[kind] = frozenset()
+        return self._sets[kind]
+
+    def _load(self, kind):
+        if self._version is None:
+            self._version = get_user_version(self.user.pk)
+        backend = caches[settings.CATALOGUE_CACHE_ALIAS]
+        key = f'viewer:{self.user.pk}:{self._version}:{kind}'
+        ids = backend.get(key)
+        if ids is None:
+            ids = frozenset(QUERIES[kind](self.user.pk))
+            if len(ids) <= settings.VIEWER_STATE_MAX_IDS:
+                backend.set(key, ids, timeout=settings.VIEWER_STATE_TIMEOUT)
+        return ids
+
+
+def get_viewer_state(request):
+    """Состояние пользователя, общее для всех сериализаторов запроса."""
+    state = getattr(request, '_viewer_state', None)
+    if state is None:
+        state = ViewerState(request.user)
+        request._viewer_state = state
+    return state
@@ -1,6 +1,7 @@
-import csv
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
@@ -8,62 +9,98 @@ from rest_framework import response, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
+from . import shopping_list
+from .autocomplete import ingredient_index
 from .filters import IngredientNameFilter, RecipeFilter
-from .mixins import ListRetrieveModelViewSet
-from .paginators import NumPageLimitPagination
+from .cache import ingredients_cache, tags_cache
+from .mixins import (CachedCatalogueMixin, ConditionalRecipeMixin,
+                     KeysetPaginationMixin, ListRetrieveModelViewSet)
+from .paginators import KeysetPagination, NumPageLimitPagination
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
     FollowSerializer,
     FavoriteSerializer,
+    IdListSerializer,
     IngredientSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     SubscriptionSerializer,
     TagSerializer,
     UserSerializer,
+    get_recipes_limit,
 )
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.feed import FEED_ORDERING
+from recipes.models import FeedEntry, Ingredient, Recipe, Tag
+from users.events import follows_created
 from users.models import Follow
 
 User = get_user_model()
 
 
-class IngredientViewSet(ListRetrieveModelViewSet):
+class IngredientViewSet(CachedCatalogueMixin, ListRetrieveModelViewSet):
     """Представление для отображения списка ингредиентов и ингредиента"""
+    catalogue_cache = ingredients_cache
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientNameFilter
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('name', '').strip():
+            return self.cached_response(self.autocomplete, request,
+                                        *args, **kwargs)
+        return super().list(request, *args, **kwargs)
 
-class TagViewSet(ListRetrieveModelViewSet):
+    def autocomplete(self, request, *args, **kwargs):
+        """Поиск ингредиентов по названию для автодополнения"""
+        name = request.query_params['name'].strip()
+        limit = settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        if settings.INGREDIENT_AUTOCOMPLETE_INDEX:
+            return response.Response(ingredient_index.search(name, limit))
+        queryset = self.filter_queryset(self.get_queryset())[:limit]
+        serializer = self.get_serializer(queryset, many=True)
+        return response.Response(serializer.data)
+
+
+class TagViewSet(CachedCatalogueMixin, ListRetrieveModelViewSet):
     """Представление для отображения списка тегов и тега"""
+    catalogue_cache = tags_cache
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalRecipeMixin, KeysetPaginationMixin,
+                    viewsets.ModelViewSet):
     """Представление для отображения, запси, изменения и удаления рецептов"""
     http_method_names = ('get', 'post', 'patch', 'delete')
     pagination_class = NumPageLimitPagination
+    keyset_ordering = ('-time_create', '-id')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
     def get_queryset(self):
         if self.request.method == 'GET':
+            user = self.request.user
+            if settings.RECIPE_FRAGMENT_CACHE:
+                queryset = Recipe.objects.select_related('author')
+            else:
+                queryset = Recipe.objects.with_related()
+            queryset = queryset.with_user_flags(user)
             is_favorited = self.request.GET.get('is_favorited', 0)
             in_cart = self.request.GET.get('is_in_shopping_cart', 0)
-            user = self.request.user
             if user.is_authenticated:
                 if is_favorited == '1':
-                    return user.favorites.all()
+                    return queryset.filter(is_favorited=True)
                 if in_cart == '1':
-                    return user.shopping_cart.all()
+                    return queryset.filter(is_in_shopping_cart=True)
+            return queryset
         return Recipe.objects.all()
 
     def get_permissions(self):
+        if self.action == 'feed':
+            return (IsAuthenticated(),)
         if self.request.method in ('GET', 'PATCH', 'DELETE'):
             return (IsAuthorOrReadOnly(),)
         return (IsAuthenticated(),)
@@ -73,13 +110,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @action(methods=('get',), detail=False)
+    def feed(self, request, **kwargs):
+        """Лента рецептов авторов, на которых подписан пользователь"""
+        paginator = KeysetPagination(FEED_ORDERING)
+        entries = paginator.paginate_queryset(
+            FeedEntry.objects.filter(user=request.user).only(
+                'recipe_id', 'time_create'
+            ),
+            request,
+            view=self,
+        )
+        recipes = self.get_queryset().in_bulk(
+            [entry.recipe_id for entry in entries]
+        )
+        serializer = self.get_serializer(
+            [recipes[entry.recipe_id] for entry in entries
+             if entry.recipe_id in recipes],
+            many=True,
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     @action(methods=('post',), detail=True,
             permission_classes=(IsAuthenticated,))
     def favorite(self, request, **kwargs):
         """Добавить рецепт в избранное"""
         recipe = get_object_or_404(Recipe, pk=self.kwargs['pk'])
         user = request.user
-        if recipe in user.favorites.all():
+        if user.favorites.filter(pk=recipe.pk).exists():
             return response.Response({'error': 'Рецепт уже в избранном'},
                                      status=status.HTTP_400_BAD_REQUEST)
         user.favorites.add(recipe)
@@ -92,7 +150,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Удаляем рецепт из избранного"""
         recipe = get_object_or_404(Recipe, id=self.kwargs['pk'])
         user = request.user
-        if recipe in user.favorites.all():
+        if user.favorites.filter(pk=recipe.pk).exists():
             user.favorites.remove(recipe)
             return response.Response(status=status.HTTP_204_NO_CONTENT)
         return response.Response({'error': 'Такого рецепта нет в избранном'},
@@ -104,7 +162,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Добавить рецепт в корзину"""
         recipe = get_object_or_404(Recipe, pk=self.kwargs['pk'])
         user = request.user
-        if recipe in user.shopping_cart.all():
+        if user.shopping_cart.filter(pk=recipe.pk).exists():
             return response.Response({'error': 'Рецепт уже в корзине'},
                                      status=status.HTTP_400_BAD_REQUEST)
         user.shopping_cart.add(recipe)
@@ -117,42 +175,74 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Удаляем рецепт из корзины"""
         recipe = get_object_or_404(Recipe, id=self.kwargs['pk'])
         user = request.user
-        if recipe in user.shopping_cart.all():
+        if user.shopping_cart.filter(pk=recipe.pk).exists():
             user.shopping_cart.remove(recipe)
             return response.Response(status=status.HTTP_204_NO_CONTENT)
         return response.Response({'error': 'Такого рецепта нет в корзине'},
                                  status=status.HTTP_400_BAD_REQUEST)
 
+    def change_recipes_batch(self, request, related_name):
+        """Добавляет или удаляет пачку рецептов в избранном или корзине"""
+        serializer = IdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        related = getattr(request.user, related_name)
+        found = set(
+            Recipe.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+        linked = set(
+            related.filter(pk__in=found).values_list('pk', flat=True)
+        )
+        if request.method == 'POST':
+            related.add(*(found - linked))
+            statuses = ('added', 'already_added')
+        else:
+            related.remove(*linked)
+            statuses = ('not_added', 'removed')
+        return response.Response({'results': [
+            {'id': pk, 'status': (statuses[pk in linked] if pk in found
+                                  else 'not_found')}
+            for pk in ids
+        ]}, status=status.HTTP_200_OK)
+
+    @action(methods=('post', 'delete'), detail=False,
+            url_path='favorite/batch', permission_classes=(IsAuthenticated,))
+    def favorite_batch(self, request, **kwargs):
+        """Добавить или удалить несколько рецептов в избранном"""
+        return self.change_recipes_batch(request, 'favorites')
+
+    @action(methods=('post', 'delete'), detail=False,
+            url_path='shopping_cart/batch',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_batch(self, request, **kwargs):
+        """Добавить или удалить несколько рецептов в корзине"""
+        return self.change_recipes_batch(request, 'shopping_cart')
+
     @action(methods=('get',), detail=False,
             permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request, **kwargs):
+        """Скачать список покупок в формате csv (по умолчанию) или txt"""
+        file_format = request.query_params.get('type', 'csv')
+        if file_format not in shopping_list.FORMATS:
+            return response.Response(
+                {'error': 'Неподдерживаемый формат файла'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, iter_file = shopping_list.FORMATS[file_format]
         user = request.user
-        shopping_cart = user.shopping_cart.all()
-        ingredients = {}
-        for recipe in shopping_cart:
-            for amount in recipe.amount.all():
-                ingredient = amount.ingredient.__str__()
-                if ingredient in ingredients:
-                    ingredients[ingredient] += int(amount.amount)
-                else:
-                    ingredients[ingredient] = int(amount.amount)
-
-        response = HttpResponse(content_type='text/csv',
-                                status=status.HTTP_200_OK)
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="ingredients.csv"')
-        writer = csv.DictWriter(response, fieldnames=('Ингредиент', 'Кол-во'))
-        writer.writeheader()
-        for ingredient, amount in ingredients.items():
-            writer.writerow({'Ингредиент': ingredient,
-                             'Кол-во': amount})
-
+        ingredients = list(shopping_list.get_shopping_list(user))
         user.shopping_cart.clear()
 
-        return response
+        file_response = StreamingHttpResponse(iter_file(ingredients),
+                                              content_type=content_type,
+                                              status=status.HTTP_200_OK)
+        file_response['Content-Disposition'] = (
+            f'attachment; filename="ingredients.{file_format}"'
+        )
+        return file_response
 
 
-class UserAPIViewSet(UserViewSet):
+class UserAPIViewSet(KeysetPaginationMixin, UserViewSet):
     """Представление пользователя"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -161,7 +251,21 @@ class UserAPIViewSet(UserViewSet):
     @action(methods=('get',), detail=False)
     def subscriptions(self, request, **kwargs):
         """Список подписок"""
-        qs = Follow.objects.filter(user=request.user)
+        limit = get_recipes_limit(request)
+        recipes = Recipe.objects.all()
+        if limit == 0:
+            recipes = Recipe.objects.none()
+        elif limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(author=OuterRef('author'))
+                .values('pk')[:limit]
+            ))
+        qs = Follow.objects.filter(user=request.user).select_related(
+            'author__statistics'
+        ).prefetch_related(
+            Prefetch('author__recipes', queryset=recipes,
+                     to_attr='latest_recipes')
+        ).order_by('-id')
         page = self.paginate_queryset(qs)
         if page is not None:
             serializer = SubscriptionSerializer(instance=page, many=True,
@@ -190,10 +294,50 @@ class UserAPIViewSet(UserViewSet):
     def delete_subscribe(self, request, **kwargs):
         """Удаляем подписку на автора"""
         author = get_object_or_404(User, id=self.kwargs['id'])
-        subscription = request.user.follower.filter(author=author)
-        if subscription.exists():
-            subscription.delete()
+        deleted, _ = request.user.follower.filter(author=author).delete()
+        if deleted:
             return response.Response(status=status.HTTP_204_NO_CONTENT)
 
         return response.Response({'errors': 'Вы не подписаны на этого автора'},
                                  status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=('post', 'delete'), detail=False,
+            url_path='subscribe/batch', permission_classes=(IsAuthenticated,))
+    def subscribe_batch(self, request, **kwargs):
+        """Подписаться на нескольких авторов или отписаться от них"""
+        serializer = IdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user = request.user
+        found = set(User.objects.filter(pk__in=ids).values_list('pk',
+                                                                flat=True))
+        followed = set(user.follower.filter(author_id__in=found)
+                       .values_list('author_id', flat=True))
+        if request.method == 'POST':
+            found.discard(user.pk)
+            created = found - followed
+            if created:
+                Follow.objects.bulk_create(
+                    [Follow(user=user, author_id=pk) for pk in created],
+                    ignore_conflicts=True,
+                )
+                # bulk_create не отправляет post_save: лента и версия
+                # пользователя обновляются одним сигналом на всю пачку
+                follows_created.send(sender=Follow, user_id=user.pk,
+                                     author_ids=created)
+            statuses = ('subscribed', 'already_subscribed')
+        else:
+            user.follower.filter(author_id__in=followed).delete()
+            statuses = ('not_subscribed', 'unsubscribed')
+
+        def get_status(pk):
+            if pk == user.pk:
+                return 'self'
+            if pk not in found:
+                return 'not_found'
+            return statuses[pk in followed]
+
+        return response.Response(
+            {'results': [{'id': pk, 'status': get_status(pk)} for pk in ids]},
+            status=status.HTTP_200_OK
+        )
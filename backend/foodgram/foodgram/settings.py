@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,10 +86,74 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Время жизни постоянного соединения (сек), 0 — новое на запрос
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        # Обязательно при пулинге pgbouncer в режиме transaction
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_DISABLE_SERVER_SIDE_CURSORS', default='False') == 'True',
     }
 }
 
+# Проверка постоянного соединения с БД в начале запроса (api.signals),
+# если оно простаивало дольше этого времени (сек); 0 — не проверять
+DB_CONN_CHECK_IDLE = int(os.getenv('DB_CONN_CHECK_IDLE', default=30))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+# Срок жизни версий кэша (справочники, пользователи), если CACHE_BACKEND —
+# LocMemCache: у каждого воркера свой кэш, и изменения из других процессов
+# становятся видны не позже чем через это время. С memcached или
+# DatabaseCache версии не истекают и изменения видны сразу.
+CACHE_VERSION_TIMEOUT = int(os.getenv('CACHE_VERSION_TIMEOUT', default=30))
+
+# Кэш справочников тегов и ингредиентов
+CATALOGUE_CACHE_ALIAS = 'default'
+CATALOGUE_CACHE_MAXSIZE = int(os.getenv('CATALOGUE_CACHE_MAXSIZE',
+                                        default=512))
+
+# Время кэширования анонимных ответов со списком рецептов на прокси (сек)
+RECIPE_CACHE_MAX_AGE = int(os.getenv('RECIPE_CACHE_MAX_AGE', default=60))
+
+# Кэш представлений рецептов без полей, зависящих от пользователя
+RECIPE_FRAGMENT_CACHE = os.getenv('RECIPE_FRAGMENT_CACHE',
+                                  default='True') == 'True'
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60
+
+# Кэш id избранного, корзины и подписок пользователя (api.viewer)
+VIEWER_STATE_TIMEOUT = int(os.getenv('VIEWER_STATE_TIMEOUT', default=600))
+VIEWER_STATE_MAX_IDS = int(os.getenv('VIEWER_STATE_MAX_IDS', default=10000))
+
+# Автодополнение ингредиентов: индекс в памяти процесса или запрос к БД
+INGREDIENT_AUTOCOMPLETE_INDEX = os.getenv(
+    'INGREDIENT_AUTOCOMPLETE_INDEX', default='True'
+) == 'True'
+INGREDIENT_AUTOCOMPLETE_LIMIT = int(os.getenv(
+    'INGREDIENT_AUTOCOMPLETE_LIMIT', default=50
+))
+
+# Полнотекстовый поиск рецептов
+SEARCH_CONFIG = 'russian'
+SEARCH_SQLITE_LIMIT = 1000
+
+# Максимальное количество рецептов в ленте подписок пользователя
+FEED_MAX_SIZE = int(os.getenv('FEED_MAX_SIZE', default=1000))
+
+# Рейтинг рецептов (команда update_rankings): окно и «гравитация» затухания
+TRENDING_WINDOW_DAYS = int(os.getenv('TRENDING_WINDOW_DAYS', default=14))
+TRENDING_GRAVITY = 1.5
+
+# Максимальное количество id в пакетных запросах избранного, корзины и подписок
+BATCH_MAX_SIZE = 100
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -113,10 +178,29 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+# Кэш токенов авторизации (только с общим CACHE_BACKEND): срок жизни
+# в общем кэше и в памяти процесса. С TOKEN_CACHE_LOCAL_TIMEOUT > 0
+# отозванный токен в других воркерах работает ещё до стольких секунд.
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=300))
+TOKEN_CACHE_LOCAL_TIMEOUT = int(os.getenv('TOKEN_CACHE_LOCAL_TIMEOUT',
+                                          default=0))
+TOKEN_CACHE_MAXSIZE = 10000
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
@@ -131,6 +215,28 @@ DJOSER = {
     },
 }
 
+# Мониторинг: порог медленного запроса и адреса, с которых доступны метрики
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS',
+                                          default=500))
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS',
+                                default='127.0.0.1').split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -151,9 +257,25 @@ USE_TZ = True
 STATIC_URL = '/django_static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'django_static')
 
+# Каталог с данными справочников (ingredients.json, tags.json)
+DATA_DIR = os.getenv('DATA_DIR',
+                     default=os.path.join(BASE_DIR.parent.parent, 'data'))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Изображения рецептов: максимальный размер загрузки и миниатюры,
+# которые создаются в фоновых потоках (recipes.images)
+RECIPE_IMAGE_MAX_SIZE = int(os.getenv('RECIPE_IMAGE_MAX_SIZE',
+                                      default=5 * 1024 * 1024))
+RECIPE_THUMBNAIL_GEOMETRY = '480x360'
+RECIPE_THUMBNAIL_OPTIONS = {'crop': 'center', 'format': 'WEBP',
+                            'quality': 80}
+IMAGE_PROCESSING_ASYNC = os.getenv('IMAGE_PROCESSING_ASYNC',
+                                   default='True') == 'True'
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS',
+                                         default=2))
+
 # Email
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
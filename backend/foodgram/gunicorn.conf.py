@@ -0,0 +1,33 @@
+"""Настройки gunicorn, значения читаются из переменных окружения."""
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS',
+                        default=multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', default=1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS',
+                         default='gthread' if threads > 1 else 'sync')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+# Перезапуск воркеров ограничивает рост памяти; jitter разносит перезапуски
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER',
+                                    default=100))
+
+
+def on_starting(server):
+    """Метрики прошлого запуска в многопроцессном режиме (api.metrics)
+    удаляются, иначе счётчики продолжат старые значения."""
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
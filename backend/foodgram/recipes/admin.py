@@ -2,7 +2,8 @@ from django.contrib import admin
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 
-from .models import Amount, Ingredient, Recipe, Tag
+from .images import update_thumbnail
+from .models import Amount, Favorite, Ingredient, Recipe, ShoppingCart, Tag
 
 
 class IngredientResource(resources.ModelResource):
@@ -10,6 +11,7 @@ class IngredientResource(resources.ModelResource):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit',)
+        import_id_fields = ('name', 'measurement_unit',)
 
 
 class IngredientAdmin(ImportExportModelAdmin):
@@ -18,17 +20,45 @@ class IngredientAdmin(ImportExportModelAdmin):
     search_fields = ('name',)
 
 
+def touch_recipes(recipe_ids):
+    """Обновляет time_modify рецептов, ингредиенты которых изменены
+    не через API: по нему строятся ETag и ключи кэша представлений."""
+    for recipe in Recipe.objects.filter(pk__in=recipe_ids):
+        recipe.save(update_fields=['time_modify'])
+
+
 class AmountResource(resources.ModelResource):
 
     class Meta:
         model = Amount
         fields = ('id', 'recipe', 'ingredient', 'amount',)
 
+    def after_save_instance(self, instance, using_transactions, dry_run):
+        if not dry_run:
+            touch_recipes([instance.recipe_id])
+
+    def after_delete_instance(self, instance, dry_run):
+        if not dry_run:
+            touch_recipes([instance.recipe_id])
+
 
 class AmountAdmin(ImportExportModelAdmin):
     resource_class = AmountResource
     list_display = ('id', 'recipe', 'ingredient', 'amount',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        touch_recipes({obj.recipe_id, form.initial.get('recipe')} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        touch_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        touch_recipes(recipe_ids)
+
 
 class RecipeResource(resources.ModelResource):
     class Meta:
@@ -36,12 +66,33 @@ class RecipeResource(resources.ModelResource):
         fields = ('id', 'author', 'name', 'text', 'cooking_time', 'image')
 
 
+class FavoriteInline(admin.TabularInline):
+    model = Favorite
+    extra = 0
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at',)
+
+
+class ShoppingCartInline(admin.TabularInline):
+    model = ShoppingCart
+    extra = 0
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at',)
+
+
 class RecipeAdmin(ImportExportModelAdmin):
     resource_class = RecipeResource
-    list_display = ('id', 'name', 'author', 'cooking_time', 'image')
+    list_display = ('id', 'name', 'author', 'cooking_time', 'image',
+                    'favorites_count', 'shopping_cart_count')
     search_fields = ('name', 'author')
     list_filter = ('tags',)
-    filter_horizontal = ('subscribers', 'buyers', 'tags',)
+    filter_horizontal = ('tags',)
+    inlines = (FavoriteInline, ShoppingCartInline)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            update_thumbnail(obj)
 
 
 class TagResource(resources.ModelResource):
@@ -0,0 +1,121 @@
+"""Потоковая загрузка справочников ингредиентов и тегов."""
+import csv
+import json
+import os
+from collections import Counter
+from itertools import islice
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Построчно разбирает JSON-массив объектов, читая файл частями,
+    чтобы не держать в памяти весь документ."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if not started and buffer:
+            if buffer[0] != '[':
+                raise ValueError('Ожидается JSON-массив')
+            buffer = buffer[1:]
+            started = True
+            continue
+        if started and buffer.startswith(']'):
+            return
+        if started and buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+        if eof:
+            if started:
+                raise ValueError('Неожиданный конец JSON-массива')
+            return
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_rows(path):
+    """Строки справочника из JSON- или CSV-файла."""
+    with open(path, encoding='utf-8') as file:
+        if os.path.splitext(path)[1].lower() == '.csv':
+            yield from csv.DictReader(file)
+        else:
+            yield from iter_json_array(file)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def upsert(model, rows, key_fields, update_fields=(), batch_size=1000):
+    """Пакетно вставляет новые и обновляет изменившиеся строки
+    справочника по уникальному ключу key_fields.
+
+    Возвращает Counter с ключами inserted, updated и skipped.
+    Пропускаются строки без обязательных полей, повторы внутри файла,
+    строки, совпадающие с уже сохранёнными, и строки, которые база не
+    вставила из-за конфликта по другому уникальному полю (например,
+    новый slug тега с занятым названием).
+    """
+    fields = (*key_fields, *update_fields)
+    stats = Counter(inserted=0, updated=0, skipped=0)
+    for batch in batches(rows, batch_size):
+        data = {}
+        for row in batch:
+            values = {field: str(row.get(field) or '').strip()
+                      for field in fields}
+            key = tuple(values[field] for field in key_fields)
+            if not all(values.values()) or key in data:
+                stats['skipped'] += 1
+                continue
+            data[key] = values
+
+        first = key_fields[0]
+        existing = {
+            tuple(getattr(obj, field) for field in key_fields): obj
+            for obj in model.objects.filter(**{
+                f'{first}__in': {key[0] for key in data}
+            }).only('pk', *fields)
+        }
+        created, changed = [], []
+        for key, values in data.items():
+            obj = existing.get(key)
+            if obj is None:
+                created.append(model(**values))
+            elif any(getattr(obj, field) != values[field]
+                     for field in update_fields):
+                for field in update_fields:
+                    setattr(obj, field, values[field])
+                changed.append(obj)
+            else:
+                stats['skipped'] += 1
+        model.objects.bulk_create(created, ignore_conflicts=True)
+        if changed:
+            model.objects.bulk_update(changed, update_fields)
+        # С ignore_conflicts база молча отбрасывает конфликтующие строки,
+        # поэтому вставленные определяются повторным запросом
+        created_keys = {tuple(getattr(obj, field) for field in key_fields)
+                        for obj in created}
+        inserted = set()
+        if created_keys:
+            inserted = created_keys & set(model.objects.filter(**{
+                f'{first}__in': {key[0] for key in created_keys}
+            }).values_list(*key_fields))
+        stats['inserted'] += len(inserted)
+        stats['skipped'] += len(created_keys) - len(inserted)
+        stats['updated'] += len(changed)
+    return stats
@@ -0,0 +1,12 @@
+"""Сигналы об изменениях рецептов, которые выполняются запросами UPDATE
+в обход save() и поэтому не отправляют post_save."""
+from django.dispatch import Signal
+
+# Миниатюра рецепта создана (recipes.images), аргумент recipe_id
+thumbnail_created = Signal()
+
+# Команда update_rankings пересчитала рейтинги рецептов
+rankings_updated = Signal()
+
+# Команда recount_counters исправила счётчики избранного и списков покупок
+counters_updated = Signal()
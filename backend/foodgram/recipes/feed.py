@@ -0,0 +1,116 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Лента заполняется при записи: новый рецепт добавляется в ленты всех
+подписчиков автора, при подписке в ленту добавляются последние рецепты
+автора, при отписке — удаляются. В ленте хранится не больше
+FEED_MAX_SIZE последних рецептов, поэтому чтение — просмотр диапазона
+индекса (user, -time_create) независимо от количества подписок.
+
+Рассылка нового рецепта подписчикам выполняется после коммита
+транзакции, в которой он создан, и не удерживает её блокировки. Если
+рассылка не удалась, ленты восстанавливает команда rebuild_feeds.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import FeedEntry, Recipe
+from users.models import Follow
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+FEED_ORDERING = ('-time_create', '-recipe_id')
+
+TRIM_SQL = """
+DELETE FROM {table} WHERE {pk} IN (
+    SELECT {pk} FROM (
+        SELECT {pk}, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY time_create DESC, recipe_id DESC
+        ) AS position
+        FROM {table}
+        WHERE user_id IN ({user_ids})
+    ) ranked
+    WHERE position > %s
+)
+"""
+
+
+def trim_feeds(user_ids):
+    """Удаляет из лент записи сверх FEED_MAX_SIZE последних.
+
+    Одним запросом на пачку пользователей: записи нумеруются в порядке
+    индекса ленты (time_create, recipe_id), поэтому рецепты с одинаковым
+    time_create не удаляются лишними.
+    """
+    user_ids = list(user_ids)
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    pk = connection.ops.quote_name(FeedEntry._meta.pk.column)
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+            cursor.execute(
+                TRIM_SQL.format(table=table, pk=pk,
+                                user_ids=', '.join(['%s'] * len(batch))),
+                [*batch, settings.FEED_MAX_SIZE],
+            )
+
+
+@transaction.atomic
+def fan_out_recipe(recipe_id):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values_list(
+        'author_id', 'time_create'
+    ).first()
+    if recipe is None:
+        return
+    author_id, time_create = recipe
+    followers = list(Follow.objects.filter(author=author_id).values_list(
+        'user_id', flat=True
+    ))
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                   time_create=time_create)
+         for user_id in followers),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_feeds(followers)
+
+
+def schedule_fan_out(recipe_id):
+    transaction.on_commit(lambda: run_fan_out(recipe_id))
+
+
+def run_fan_out(recipe_id):
+    try:
+        fan_out_recipe(recipe_id)
+    except Exception:
+        logger.exception('Не удалось добавить рецепт %s в ленты подписок',
+                         recipe_id)
+
+
+def fill_feed(user_id, author_ids):
+    """Добавляет в ленту последние рецепты авторов без обрезки ленты."""
+    recipes = Recipe.objects.filter(author__in=author_ids).order_by(
+        '-time_create', '-id'
+    ).values_list('pk', 'time_create')[:settings.FEED_MAX_SIZE]
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=pk, time_create=time_create)
+         for pk, time_create in recipes),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_feed(user_id, author_ids):
+    """Добавляет в ленту последние рецепты авторов, на которых
+    подписался пользователь."""
+    fill_feed(user_id, author_ids)
+    trim_feeds([user_id])
+
+
+def prune_feed(user_id, author_id):
+    """Удаляет из ленты рецепты автора после отписки."""
+    FeedEntry.objects.filter(user=user_id, recipe__author=author_id).delete()
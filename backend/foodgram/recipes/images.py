@@ -0,0 +1,83 @@
+"""Фоновое создание миниатюр изображений рецептов.
+
+Миниатюра строится sorl.thumbnail в пуле потоков после коммита
+транзакции, поэтому перекодирование не задерживает ответ на запрос.
+При IMAGE_PROCESSING_ASYNC=False миниатюра создаётся сразу (тесты,
+отладка).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+
+from .events import thumbnail_created
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+def get_thumbnail_options():
+    options = dict(settings.RECIPE_THUMBNAIL_OPTIONS)
+    if options.get('format') == 'WEBP' and not features.check('webp'):
+        options['format'] = 'JPEG'
+    return options
+
+
+def update_thumbnail(recipe):
+    """Сбрасывает миниатюру сохранённого рецепта с новым изображением
+    и ставит в очередь создание новой.
+
+    Вызывается там, где изображение меняется (сериализатор рецепта,
+    админка), а не сигналом: иначе каждый загруженный из базы рецепт
+    пришлось бы сравнивать с исходным.
+    """
+    from .models import Recipe
+
+    if recipe.thumbnail:
+        recipe.thumbnail = None
+        Recipe.objects.filter(pk=recipe.pk).update(thumbnail=None)
+    if recipe.image:
+        schedule_thumbnail(recipe.pk)
+
+
+def schedule_thumbnail(recipe_id):
+    if settings.IMAGE_PROCESSING_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(run_in_worker, recipe_id)
+        )
+    else:
+        transaction.on_commit(lambda: make_thumbnail(recipe_id))
+
+
+def run_in_worker(recipe_id):
+    try:
+        make_thumbnail(recipe_id)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру рецепта %s',
+                         recipe_id)
+    finally:
+        connections.close_all()
+
+
+def make_thumbnail(recipe_id):
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    thumbnail = get_thumbnail(recipe.image, settings.RECIPE_THUMBNAIL_GEOMETRY,
+                              **get_thumbnail_options())
+    # Изображение могли заменить, пока строилась миниатюра
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(thumbnail=thumbnail.name, time_modify=timezone.now())
+    if updated:
+        thumbnail_created.send(sender=Recipe, recipe_id=recipe_id)
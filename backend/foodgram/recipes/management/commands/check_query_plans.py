@@ -0,0 +1,108 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.feed import FEED_ORDERING
+from recipes.models import (FeedEntry, Favorite, Ingredient, Recipe,
+                            ShoppingCart)
+from users.models import Follow
+
+User = get_user_model()
+
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?!.*\bUSING\b)')
+
+
+def get_hot_queries(user, recipe):
+    """Запросы горячих путей API и признак того, что их сортировка
+    должна выполняться по индексу, без отдельного шага Sort."""
+    queries = {
+        'recipes_list': (Recipe.objects.all()[:6], True),
+        'recipes_author': (
+            Recipe.objects.filter(author=recipe.author_id)[:6], True),
+        'recipes_favorited': (
+            Recipe.objects.filter(subscribers=user)[:6], False),
+        'recipes_in_shopping_cart': (
+            Recipe.objects.filter(buyers=user)[:6], False),
+        'recipes_feed': (
+            FeedEntry.objects.filter(user=user).order_by(*FEED_ORDERING)[:6],
+            True),
+        'is_favorited': (
+            Favorite.objects.filter(user=user, recipe=recipe), False),
+        'is_in_shopping_cart': (
+            ShoppingCart.objects.filter(user=user, recipe=recipe), False),
+        'is_subscribed': (
+            Follow.objects.filter(user=user, author=recipe.author_id), False),
+        'subscriptions': (Follow.objects.filter(user=user), False),
+        'followers': (Follow.objects.filter(author=recipe.author_id), False),
+    }
+    if connection.vendor == 'postgresql':
+        # Индекс создаётся только в PostgreSQL (миграция recipes 0004)
+        queries['ingredients_prefix'] = (
+            Ingredient.objects.filter(name__istartswith='мук').order_by(),
+            False)
+    return queries
+
+
+def get_problems(plan, sorted_by_index):
+    """Полные просмотры таблиц и сортировки в плане запроса."""
+    problems = []
+    if connection.vendor == 'postgresql':
+        nodes = [json.loads(plan)[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get('Plans', ()))
+            if node['Node Type'] == 'Seq Scan':
+                problems.append(f'Seq Scan {node["Relation Name"]}')
+            elif node['Node Type'] == 'Sort' and sorted_by_index:
+                problems.append(f'Sort {", ".join(node["Sort Key"])}')
+        return problems
+    for line in plan.splitlines():
+        match = SQLITE_SCAN.search(line)
+        if match:
+            problems.append(f'SCAN {match.group(1)}')
+        elif 'TEMP B-TREE FOR ORDER BY' in line and sorted_by_index:
+            problems.append('TEMP B-TREE FOR ORDER BY')
+    return problems
+
+
+class Command(BaseCommand):
+    help = ('Проверяет через EXPLAIN, что горячие запросы API используют '
+            'индексы. Завершается ошибкой при полном просмотре таблицы '
+            'или сортировке, которую должен был заменить индекс')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Выводить планы запросов целиком')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        user = User.objects.order_by('pk').first()
+        recipe = Recipe.objects.order_by('pk').first()
+        if user is None or recipe is None:
+            raise CommandError('Нет данных: выполните seed_benchmark_data')
+        if connection.vendor == 'postgresql':
+            # На маленьких таблицах планировщик предпочитает Seq Scan, даже
+            # если подходящий индекс есть. Запрет проверяет само наличие
+            # индекса, которым можно воспользоваться.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            explain_options = {'format': 'json'}
+        else:
+            explain_options = {}
+
+        failures = []
+        for name, (queryset, sorted_by_index) in get_hot_queries(
+                user, recipe).items():
+            plan = queryset.explain(**explain_options)
+            problems = get_problems(plan, sorted_by_index)
+            status = ', '.join(problems) if problems else 'ok'
+            self.stdout.write(f'{name:<26}{status}')
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+            failures.extend(f'{name}: {problem}' for problem in problems)
+        if failures:
+            raise CommandError('Запросы без подходящих индексов:\n'
+                               + '\n'.join(failures))
@@ -0,0 +1,63 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import ingredients_cache, tags_cache
+from recipes.catalogue import iter_rows, upsert
+from recipes.models import Ingredient, Tag
+
+CATALOGUES = {
+    'ingredients': {
+        'model': Ingredient,
+        'key_fields': ('name', 'measurement_unit'),
+        'update_fields': (),
+        'cache': ingredients_cache,
+    },
+    'tags': {
+        'model': Tag,
+        'key_fields': ('slug',),
+        'update_fields': ('name', 'color'),
+        'cache': tags_cache,
+    },
+}
+
+
+class Command(BaseCommand):
+    help = ('Загружает справочники ингредиентов и тегов из JSON или CSV '
+            'пакетами, обновляя уже существующие записи')
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalogue', nargs='?', choices=CATALOGUES,
+                            help='Загрузить только указанный справочник')
+        parser.add_argument('--path',
+                            help='Файл справочника (по умолчанию '
+                                 '<DATA_DIR>/<справочник>.json)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['path'] and not options['catalogue']:
+            raise CommandError('Для --path нужно указать справочник')
+        for name in [options['catalogue']] if options['catalogue'] \
+                else CATALOGUES:
+            path = options['path'] or os.path.join(settings.DATA_DIR,
+                                                   f'{name}.json')
+            if not os.path.exists(path):
+                raise CommandError(f'Файл не найден: {path}')
+            catalogue = CATALOGUES[name]
+            with transaction.atomic():
+                stats = upsert(
+                    catalogue['model'],
+                    iter_rows(path),
+                    catalogue['key_fields'],
+                    catalogue['update_fields'],
+                    batch_size=options['batch_size'],
+                )
+            if stats['inserted'] or stats['updated']:
+                catalogue['cache'].invalidate()
+            self.stdout.write(
+                f'{name}: добавлено {stats["inserted"]}, '
+                f'обновлено {stats["updated"]}, '
+                f'пропущено {stats["skipped"]}'
+            )
@@ -0,0 +1,29 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import fill_feed
+from recipes.models import FeedEntry
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = ('Заново заполняет ленты подписок по текущим подпискам. '
+            'Нужна после первого развёртывания ленты и массовой загрузки '
+            'рецептов в обход сигналов')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        FeedEntry.objects.all().delete()
+        follows = Follow.objects.order_by('user_id').values_list(
+            'user_id', 'author_id'
+        )
+        users = 0
+        for user_id, rows in groupby(follows.iterator(),
+                                     key=lambda row: row[0]):
+            fill_feed(user_id, [author_id for _, author_id in rows])
+            users += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Лент заполнено: {users}, записей: {FeedEntry.objects.count()}'
+        ))
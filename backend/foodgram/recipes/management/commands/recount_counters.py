@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.events import counters_updated
+from recipes.models import Recipe
+from users.models import UserStatistics
+
+User = get_user_model()
+
+
+def count_subquery(queryset, field):
+    """Подзапрос с количеством строк queryset для каждого OuterRef."""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(field)
+            .annotate(total=Count('*')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, списков покупок '
+            'и количества рецептов авторов')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        favorites = count_subquery(
+            Recipe.subscribers.through.objects.filter(
+                recipe=OuterRef('pk')), 'recipe'
+        )
+        shopping_cart = count_subquery(
+            Recipe.buyers.through.objects.filter(
+                recipe=OuterRef('pk')), 'recipe'
+        )
+        recipes_fixed = Recipe.objects.exclude(
+            favorites_count=favorites, shopping_cart_count=shopping_cart
+        ).update(
+            favorites_count=favorites, shopping_cart_count=shopping_cart
+        )
+
+        if recipes_fixed:
+            counters_updated.send(sender=Recipe)
+
+        UserStatistics.objects.bulk_create(
+            [UserStatistics(user_id=pk) for pk in User.objects.filter(
+                statistics__isnull=True).values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        recipes_count = count_subquery(
+            Recipe.objects.filter(author=OuterRef('user')), 'author'
+        )
+        authors_fixed = UserStatistics.objects.exclude(
+            recipes_count=recipes_count
+        ).update(recipes_count=recipes_count)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено рецептов: {recipes_fixed}, '
+            f'авторов: {authors_fixed}'
+        ))
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from recipes.events import rankings_updated
+from recipes.models import Recipe, RecipeRanking
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинги рецептов для сортировки '
+            'ordering=popular и ordering=trending. Запускается по расписанию')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        now = timezone.now()
+        window_start = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+
+        created = RecipeRanking.objects.bulk_create(
+            [RecipeRanking(recipe_id=pk) for pk in Recipe.objects.filter(
+                ranking__isnull=True).values_list('pk', flat=True)],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+        popularity = Subquery(
+            Recipe.objects.filter(pk=OuterRef('recipe_id')).values(
+                total=F('favorites_count') + F('shopping_cart_count')
+            )
+        )
+        popular_updated = RecipeRanking.objects.exclude(
+            popularity=popularity
+        ).update(popularity=popularity, time_update=now)
+
+        RecipeRanking.objects.filter(
+            recipe__time_create__lt=window_start, trending__gt=0
+        ).update(trending=0, time_update=now)
+        rankings = [
+            RecipeRanking(
+                recipe_id=pk,
+                trending=self.get_trending(
+                    favorites + shopping_carts, now - time_create
+                ),
+                time_update=now,
+            )
+            for pk, time_create, favorites, shopping_carts in (
+                Recipe.objects.filter(time_create__gte=window_start)
+                .values_list('pk', 'time_create', 'favorites_count',
+                             'shopping_cart_count')
+                .iterator()
+            )
+        ]
+        RecipeRanking.objects.bulk_update(
+            rankings, ('trending', 'time_update'), batch_size=BATCH_SIZE
+        )
+
+        rankings_updated.send(sender=RecipeRanking)
+        self.stdout.write(self.style.SUCCESS(
+            f'Новых рейтингов: {len(created)}, '
+            f'обновлено popular: {popular_updated}, '
+            f'trending: {len(rankings)}'
+        ))
+
+    @staticmethod
+    def get_trending(activity, age):
+        """Активность, затухающая со временем: score / (часы + 2)^gravity"""
+        hours = age.total_seconds() / 3600
+        return activity / (hours + 2) ** settings.TRENDING_GRAVITY
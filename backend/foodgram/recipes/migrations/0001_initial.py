@@ -0,0 +1,92 @@
+# Generated by Django 3.2 on 2026-10-18 03:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Amount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Количество ингредиента',
+                'verbose_name_plural': 'Количество ингредиентов',
+                'ordering': ['recipe'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('measurement_unit', models.CharField(max_length=200, verbose_name='Единица измерения')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент',
+                'verbose_name_plural': 'Ингредиенты',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True, verbose_name='Название')),
+                ('color', models.CharField(max_length=7, unique=True, verbose_name='Цветовой код')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Тэг',
+                'verbose_name_plural': 'Тэги',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Recipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('image', models.ImageField(blank=True, help_text='Добавить изображение', null=True, upload_to='recipes/', verbose_name='Изображение')),
+                ('text', models.TextField(help_text='Добавьте описание', verbose_name='Описание')),
+                ('cooking_time', models.IntegerField(verbose_name='Время приготовления')),
+                ('time_create', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('time_modify', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('buyers', models.ManyToManyField(blank=True, related_name='shopping_cart', to=settings.AUTH_USER_MODEL)),
+                ('ingredients', models.ManyToManyField(through='recipes.Amount', to='recipes.Ingredient')),
+                ('subscribers', models.ManyToManyField(blank=True, related_name='favorites', to=settings.AUTH_USER_MODEL)),
+                ('tags', models.ManyToManyField(related_name='recipes', to='recipes.Tag')),
+            ],
+            options={
+                'verbose_name': 'Рецепт',
+                'verbose_name_plural': 'Рецепты',
+                'ordering': ('-time_create',),
+            },
+        ),
+        migrations.AddField(
+            model_name='amount',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='amount', to='recipes.ingredient', verbose_name='Ингредиент'),
+        ),
+        migrations.AddField(
+            model_name='amount',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='amount', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddConstraint(
+            model_name='amount',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,127 @@
+from django.conf import settings
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Объединяет ингредиенты с одинаковыми названием и единицей
+    измерения перед добавлением ограничения unique_ingredient_unit.
+
+    Остаётся ингредиент с наименьшим id, строки Amount остальных
+    переносятся на него. Если в рецепте были оба дубликата, количества
+    складываются в одну строку (ограничение unique_ingredient).
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    Amount = apps.get_model('recipes', 'Amount')
+    duplicates = list(Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by())
+    for duplicate in duplicates:
+        keep = duplicate['keep']
+        merged = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(pk=keep).values_list('pk', flat=True))
+        kept = {amount.recipe_id: amount
+                for amount in Amount.objects.filter(ingredient_id=keep)}
+        for amount in Amount.objects.filter(
+                ingredient_id__in=merged).order_by('pk'):
+            if amount.recipe_id in kept:
+                kept[amount.recipe_id].amount += amount.amount
+                kept[amount.recipe_id].save(update_fields=['amount'])
+                amount.delete()
+            else:
+                amount.ingredient_id = keep
+                amount.save(update_fields=['ingredient'])
+                kept[amount.recipe_id] = amount
+        Ingredient.objects.filter(pk__in=merged).delete()
+    if duplicates and schema_editor.connection.vendor == 'postgresql':
+        # Иначе ALTER TABLE ниже в той же транзакции упадёт из-за
+        # отложенных проверок внешних ключей
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time_create', models.DateTimeField(verbose_name='Дата создания рецепта')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты подписок',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeRanking',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popularity', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(db_index=True, default=0, verbose_name='Популярность с учётом давности')),
+                ('time_update', models.DateTimeField(auto_now=True, verbose_name='Дата пересчёта')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-time_create', '-id'), 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='', verbose_name='Миниатюра'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-time_create', '-id'], name='recipe_time_create_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-time_create', '-id'], name='recipe_author_time_create_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_unit'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-time_create', '-recipe'], name='feed_user_time_create_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+    ]
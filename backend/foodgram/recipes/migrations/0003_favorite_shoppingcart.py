@@ -0,0 +1,87 @@
+"""Явные модели Favorite и ShoppingCart для связей Recipe.subscribers
+и Recipe.buyers.
+
+Таблицы прежних автоматических связей не пересоздаются: модели сначала
+описываются только в состоянии миграций поверх существующих таблиц,
+затем в них добавляется колонка created_at (для старых записей —
+время миграции) и ограничения новых моделей.
+"""
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def through_operations(model_name, db_table, field_name, related_name):
+    return [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name=model_name,
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Рецепт')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                    ],
+                    options={
+                        'db_table': db_table,
+                        'unique_together': {('recipe', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name=field_name,
+                    field=models.ManyToManyField(blank=True, related_name=related_name, through=f'recipes.{model_name}', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name=model_name.lower(),
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name=model_name.lower(),
+            unique_together=set(),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0002_recipe_counters_feed_ranking'),
+    ]
+
+    operations = [
+        *through_operations('Favorite', 'recipes_recipe_subscribers',
+                            'subscribers', 'favorites'),
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'verbose_name': 'Избранное', 'verbose_name_plural': 'Избранное'},
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx'),
+        ),
+        *through_operations('ShoppingCart', 'recipes_recipe_buyers',
+                            'buyers', 'shopping_cart'),
+        migrations.AlterModelOptions(
+            name='shoppingcart',
+            options={'verbose_name': 'Список покупок', 'verbose_name_plural': 'Списки покупок'},
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['user', '-created_at'], name='shopping_cart_user_created_idx'),
+        ),
+    ]
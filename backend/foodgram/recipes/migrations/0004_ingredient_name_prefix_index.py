@@ -0,0 +1,35 @@
+"""Индекс для поиска ингредиентов по началу названия (name__istartswith).
+
+Django строит для istartswith условие UPPER(name::text) LIKE UPPER('...%').
+Использовать для него B-tree индекс при локали, отличной от C, PostgreSQL
+может только с классом операторов text_pattern_ops, а класс операторов
+для индекса по выражению Django 3.2 объявить не позволяет, поэтому индекс
+создаётся SQL-запросом. В SQLite (разработка и тесты) индекс не нужен.
+"""
+from django.db import migrations
+
+INDEX_NAME = 'ingredient_name_upper_prefix_idx'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON recipes_ingredient '
+            f'(UPPER(name::text) text_pattern_ops)'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_favorite_shoppingcart'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
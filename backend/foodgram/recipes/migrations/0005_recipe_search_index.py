@@ -0,0 +1,58 @@
+"""Поисковый индекс рецептов (см. recipes.search).
+
+В PostgreSQL — GIN-индекс по Recipe.search_vector и заполнение колонки
+для существующих рецептов, в SQLite (разработка и тесты) — виртуальная
+таблица FTS5. Ни то ни другое Django 3.2 операциями схемы не описывает,
+поэтому индекс создаётся SQL-запросами.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+FTS_TABLE = 'recipes_recipe_fts'
+GIN_INDEX = 'recipes_recipe_search_vector_gin'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} '
+            f'ON recipes_recipe USING gin (search_vector)'
+        )
+        config = settings.SEARCH_CONFIG
+        Recipe = apps.get_model('recipes', 'Recipe')
+        Recipe.objects.filter(search_vector__isnull=True).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=config)
+                + SearchVector('text', weight='B', config=config)
+            )
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f'USING fts5(name, text, tokenize="unicode61")'
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            f'SELECT id, name, text FROM recipes_recipe'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
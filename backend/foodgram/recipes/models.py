@@ -1,9 +1,61 @@
-from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+from users.models import Follow
 
 User = get_user_model()
 
 
+def get_recipe_prefetch():
+    """Связанные объекты, которые нужны для вывода рецепта."""
+    return (
+        models.Prefetch(
+            'amount',
+            queryset=Amount.objects.select_related('ingredient'),
+        ),
+        'tags',
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты фиксированным числом
+        запросов независимо от количества рецептов."""
+        return self.select_related('author').prefetch_related(
+            *get_recipe_prefetch()
+        )
+
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами is_favorited, is_in_shopping_cart
+        и is_subscribed (подписка на автора) для пользователя."""
+        if not user.is_authenticated:
+            false = models.Value(False, output_field=models.BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                is_subscribed=false,
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Recipe.subscribers.through.objects.filter(
+                    recipe=models.OuterRef('pk'), user=user
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                Recipe.buyers.through.objects.filter(
+                    recipe=models.OuterRef('pk'), user=user
+                )
+            ),
+            is_subscribed=models.Exists(
+                Follow.objects.filter(
+                    user=user, author=models.OuterRef('author')
+                )
+            ),
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -22,6 +74,12 @@ class Recipe(models.Model):
         null=True,
         help_text='Добавить изображение',
     )
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        blank=True,
+        null=True,
+        editable=False,
+    )
     text = models.TextField(
         'Описание',
         help_text='Добавьте описание'
@@ -36,17 +94,29 @@ class Recipe(models.Model):
     )
     subscribers = models.ManyToManyField(
         User,
+        through='Favorite',
         related_name='favorites',
         blank=True,
     )
     buyers = models.ManyToManyField(
         User,
+        through='ShoppingCart',
         related_name='shopping_cart',
         blank=True,
     )
     cooking_time = models.IntegerField(
         'Время приготовления',
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False,
+    )
     time_create = models.DateTimeField(
         'Дата создания',
         auto_now_add=True,
@@ -55,16 +125,177 @@ class Recipe(models.Model):
         'Дата изменения',
         auto_now=True,
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-time_create',)
+        ordering = ('-time_create', '-id')
+        indexes = [
+            models.Index(
+                fields=('-time_create', '-id'),
+                name='recipe_time_create_id_idx',
+            ),
+            models.Index(
+                fields=('author', '-time_create', '-id'),
+                name='recipe_author_time_create_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class Favorite(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+    )
+    created_at = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        # Таблица прежней автоматической связи Recipe.subscribers
+        db_table = 'recipes_recipe_subscribers'
+        verbose_name = 'Избранное'
+        verbose_name_plural = 'Избранное'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_favorite',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-created_at'),
+                name='favorite_user_created_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в избранном у {self.user}'
+
+
+class ShoppingCart(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+    )
+    created_at = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        # Таблица прежней автоматической связи Recipe.buyers
+        db_table = 'recipes_recipe_buyers'
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_shopping_cart',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-created_at'),
+                name='shopping_cart_user_created_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в списке покупок у {self.user}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя (заполняется при записи)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    time_create = models.DateTimeField(
+        'Дата создания рецепта',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-time_create', '-recipe'),
+                name='feed_user_time_create_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        'Recipe',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт',
+    )
+    popularity = models.PositiveIntegerField(
+        'Популярность',
+        default=0,
+        db_index=True,
+    )
+    trending = models.FloatField(
+        'Популярность с учётом давности',
+        default=0,
+        db_index=True,
+    )
+    time_update = models.DateTimeField(
+        'Дата пересчёта',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+
+    def __str__(self):
+        return f'{self.recipe}: {self.popularity}'
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         'Название',
@@ -79,6 +310,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_unit'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -0,0 +1,99 @@
+"""Полнотекстовый поиск по названию и описанию рецептов.
+
+В PostgreSQL используется колонка Recipe.search_vector с GIN-индексом,
+в SQLite (разработка и тесты) — виртуальная таблица FTS5. Индекс
+создаёт миграция 0005_recipe_search_index, обновляют сигналы
+из recipes.signals.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+
+def get_search_vector():
+    config = settings.SEARCH_CONFIG
+    return (SearchVector('name', weight='A', config=config)
+            + SearchVector('text', weight='B', config=config))
+
+
+def fill_search_index():
+    """Добавляет в индекс рецепты, созданные в обход сигналов
+    (bulk_create). Сам индекс создаёт миграция 0005_recipe_search_index.
+    """
+    from .models import Recipe
+
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(search_vector__isnull=True).update(
+            search_vector=get_search_vector()
+        )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                f'SELECT id, name, text FROM {Recipe._meta.db_table} '
+                f'WHERE id NOT IN (SELECT rowid FROM {FTS_TABLE})'
+            )
+
+
+def update_search_index(recipe):
+    from .models import Recipe
+
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(pk=recipe.pk).update(
+            search_vector=get_search_vector()
+        )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           (recipe.pk,))
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                f'VALUES (%s, %s, %s)',
+                (recipe.pk, recipe.name, recipe.text)
+            )
+
+
+def delete_from_search_index(recipe_id):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           (recipe_id,))
+
+
+def search_recipes(queryset, text):
+    """Фильтрует рецепты по запросу и сортирует их по релевантности."""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=settings.SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-time_create')
+    if connection.vendor == 'sqlite':
+        ids = _sqlite_search(text)
+        return queryset.filter(pk__in=ids).annotate(
+            rank=Case(
+                *[When(pk=pk, then=Value(position))
+                  for position, pk in enumerate(ids)],
+                output_field=IntegerField(),
+            )
+        ).order_by('rank')
+    return queryset.filter(name__icontains=text)
+
+
+def _sqlite_search(text):
+    terms = ['"{}"*'.format(term.replace('"', '""'))
+             for term in text.split()]
+    if not terms:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) '
+            f'LIMIT {settings.SEARCH_SQLITE_LIMIT}',
+            (' '.join(terms),)
+        )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,154 @@
+from collections import defaultdict
+from threading import local
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .feed import backfill_feed, prune_feed, schedule_fan_out
+from .models import Favorite, Recipe, ShoppingCart
+from .search import delete_from_search_index, update_search_index
+from users.events import follows_created
+from users.models import Follow, UserStatistics
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(instance, **kwargs):
+    update_search_index(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_search_index(instance, **kwargs):
+    delete_from_search_index(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(instance, created, **kwargs):
+    if not created:
+        return
+    statistics = UserStatistics.objects.filter(user_id=instance.author_id)
+    updated = statistics.update(recipes_count=F('recipes_count') + 1)
+    if not updated:
+        UserStatistics.objects.get_or_create(
+            user_id=instance.author_id,
+            defaults={'recipes_count': Recipe.objects.filter(
+                author_id=instance.author_id).count()},
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(instance, **kwargs):
+    UserStatistics.objects.filter(
+        user_id=instance.author_id, recipes_count__gt=0
+    ).update(recipes_count=F('recipes_count') - 1)
+
+
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
+# id строк промежуточных таблиц, которые сейчас удаляет remove() или
+# clear(): счётчики для них уже изменены одним запросом в m2m_changed,
+# поэтому post_delete этих строк ничего не пересчитывает
+m2m_removals = local()
+
+
+def get_m2m_removals(sender):
+    if not hasattr(m2m_removals, 'pks'):
+        m2m_removals.pks = defaultdict(set)
+    return m2m_removals.pks[sender]
+
+
+def is_m2m_removal(sender, pk):
+    return pk in get_m2m_removals(sender)
+
+
+def change_counter(sender, recipes, delta):
+    """Счётчик не опускается ниже нуля, даже если уже разошёлся
+    с данными (его можно сверить командой recount_counters)."""
+    counter = COUNTERS[sender]
+    value = F(counter) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    recipes.update(**{counter: value})
+
+
+@receiver(m2m_changed, sender=Favorite)
+@receiver(m2m_changed, sender=ShoppingCart)
+def update_relation_counter(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """Меняет счётчики рецептов при add(), remove() и clear().
+
+    add() создаёт строки bulk_create без post_save; в pk_set при post_add
+    только действительно добавленные id. При удалении в pk_set все
+    переданные id, поэтому существующие связи выбираются до удаления.
+    time_modify не меняется: это дата изменения содержимого рецепта,
+    а счётчики выводятся поверх кэшированного представления.
+    """
+    if action == 'post_add' and pk_set:
+        if reverse:
+            change_counter(sender, Recipe.objects.filter(pk__in=pk_set), 1)
+        else:
+            change_counter(sender, Recipe.objects.filter(pk=instance.pk),
+                           len(pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.filter(
+            **{'user' if reverse else 'recipe': instance})
+        if action == 'pre_remove':
+            links = links.filter(**{
+                'recipe_id__in' if reverse else 'user_id__in': pk_set
+            })
+        rows = list(links.values_list('pk', 'recipe_id'))
+        if not rows:
+            return
+        get_m2m_removals(sender).update(pk for pk, _ in rows)
+        if reverse:
+            change_counter(sender, Recipe.objects.filter(
+                pk__in=[recipe_id for _, recipe_id in rows]), -1)
+        else:
+            change_counter(sender, Recipe.objects.filter(pk=instance.pk),
+                           -len(rows))
+    elif action in ('post_remove', 'post_clear'):
+        get_m2m_removals(sender).clear()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def count_created_relation(sender, instance, created, **kwargs):
+    """Связи, созданные напрямую: админка, Favorite.objects.create()."""
+    if created:
+        change_counter(sender, Recipe.objects.filter(pk=instance.recipe_id),
+                       1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def count_deleted_relation(sender, instance, **kwargs):
+    """Связи, удалённые напрямую или каскадом вместе с пользователем."""
+    if not is_m2m_removal(sender, instance.pk):
+        change_counter(sender, Recipe.objects.filter(pk=instance.recipe_id),
+                       -1)
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_feeds(instance, created, **kwargs):
+    if created:
+        schedule_fan_out(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def add_author_to_feed(instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, [instance.author_id])
+
+
+@receiver(follows_created)
+def add_authors_to_feed(user_id, author_ids, **kwargs):
+    backfill_feed(user_id, author_ids)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_author_from_feed(instance, **kwargs):
+    prune_feed(instance.user_id, instance.author_id)
@@ -0,0 +1,7 @@
+"""Сигналы об изменениях подписок, которые выполняются в обход save()
+и поэтому не отправляют post_save."""
+from django.dispatch import Signal
+
+# Пакетная подписка (bulk_create), аргументы user_id и author_ids —
+# авторы, на которых пользователь подписался
+follows_created = Signal()
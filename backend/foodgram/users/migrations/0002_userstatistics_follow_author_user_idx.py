@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatistics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Количество рецептов')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+    ]
@@ -36,3 +36,30 @@ class Follow(models.Model):
                 name='follower_and_author_can_not_be_equal',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class UserStatistics(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='statistics',
+        verbose_name='Пользователь',
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'{self.user}: {self.recipes_count} рецептов'